@@ -0,0 +1,136 @@
+"""Parallel image loading with an on-disk cache of decoded pixels.
+
+The first launch decodes PNGs in a thread pool and writes each one as raw
+RGBA next to a manifest. Later launches memory-map those files and build
+surfaces with pygame.image.frombuffer, skipping PNG decoding entirely.
+Entries are invalidated when the source file's mtime or size changes and
+its content hash no longer matches. When the cache directory cannot be
+created or written, images are decoded as usual and simply not cached.
+"""
+import hashlib
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+CACHE_DIR = os.environ.get("NEURONEST_CACHE_DIR", ".cache/assets")
+MANIFEST_NAME = "manifest.json"
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_file_name(path):
+    return hashlib.blake2b(os.path.normpath(path).encode(), digest_size=8).hexdigest() + ".rgba"
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST_NAME))
+
+def is_fresh(path, entry, cache_dir):
+    """Check a manifest entry against its source, re-hashing only when mtime or size moved"""
+    if entry is None or not os.path.exists(os.path.join(cache_dir, entry["file"])):
+        return False
+    stat = os.stat(path)
+    if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return True
+    if entry["size"] == stat.st_size and entry["hash"] == file_hash(path):
+        entry["mtime_ns"] = stat.st_mtime_ns  # Touched but unchanged
+        return True
+    return False
+
+def map_cached(entry, cache_dir):
+    """Build a surface straight from the memory-mapped raw pixels"""
+    with open(os.path.join(cache_dir, entry["file"]), "rb") as f:
+        pixels = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return pygame.image.frombuffer(pixels, tuple(entry["dimensions"]), "RGBA")
+
+def decode_and_store(path, cache_dir):
+    """Decode a PNG and write its raw RGBA pixels to the cache, returning the
+    surface and its manifest entry, or None for the entry if it was not cached"""
+    surface = pygame.image.load(path)
+    if cache_dir is None:
+        return surface, None
+    stat = os.stat(path)
+    entry = {
+        "file": cache_file_name(path),
+        "dimensions": list(surface.get_size()),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": file_hash(path),
+    }
+    tmp_path = os.path.join(cache_dir, entry["file"] + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(pygame.image.tobytes(surface, "RGBA"))
+        os.replace(tmp_path, os.path.join(cache_dir, entry["file"]))
+    except OSError:
+        return surface, None
+    return surface, entry
+
+def load_images(paths, cache_dir=CACHE_DIR, workers=None):
+    """Load every path, returning ({path: surface}, stats).
+
+    Surfaces are not converted; call convert_alpha() on the main thread once
+    the display exists. Paths that fail to load are left out and listed in
+    stats["errors"].
+    """
+    start = time.perf_counter()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        cache_dir = None  # Decode everything, caching nothing
+    manifest = load_manifest(cache_dir) if cache_dir else {}
+    images = {}
+    errors = {}
+    stale = []
+
+    for path in paths:
+        try:
+            if is_fresh(path, manifest.get(path), cache_dir):
+                images[path] = map_cached(manifest[path], cache_dir)
+            else:
+                stale.append(path)
+        except (OSError, ValueError, KeyError) as e:
+            errors[path] = e
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(decode_and_store, path, cache_dir) for path in stale}
+            for path, future in futures.items():
+                try:
+                    images[path], entry = future.result()
+                except (OSError, pygame.error) as e:
+                    errors[path] = e
+                    continue
+                if entry is not None:
+                    manifest[path] = entry
+
+    if cache_dir:
+        try:
+            save_manifest(cache_dir, manifest)
+        except OSError:
+            pass  # The images are loaded, they just load uncached again next time
+    decoded = len([path for path in stale if path not in errors])
+    stats = {
+        "cached": len(images) - decoded,
+        "decoded": decoded,
+        "errors": errors,
+        "seconds": time.perf_counter() - start,
+    }
+    return images, stats
@@ -0,0 +1,229 @@
+"""In-app capture of a session to video, or to a directory of PNG frames.
+
+The game copies the screen's pixels into one of a pool of frame buffers in
+shared memory after each frame is presented and queues the buffer's index;
+an encoder process turns queued buffers into video by piping them to ffmpeg,
+or into PNG files, and hands each buffer back once done. When every buffer
+is still waiting to be encoded the frame is dropped and counted, so the game
+never waits for the encoder. Sounds the game plays are queued as events with
+their time and mixed into the video's audio track at the end.
+
+Frames are numbered by the time since the capture started. A video keeps
+real time by repeating the frame before over one missed by a slow loop or
+dropped; PNG files keep the number, leaving a gap.
+"""
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import time
+import wave
+from multiprocessing import shared_memory
+
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".webm")
+AUDIO_RATE = 44100
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+def find_ffmpeg():
+    return shutil.which("ffmpeg")
+
+def pixel_order(surface):
+    """Channel letters of a 32-bit surface's pixels in memory order, e.g. "bgr0" (ffmpeg's names)"""
+    order = ["0"] * 4
+    for letter, mask, shift in zip("rgb", surface.get_masks(), surface.get_shifts()):
+        if mask:
+            order[shift // 8] = letter
+    return "".join(order)
+
+class FrameCapture:
+    """Captures the screen fps times a second into path, with pool frame buffers in flight"""
+    def __init__(self, path, surface, fps=30, pool=8):
+        if surface.get_bytesize() != 4:
+            raise ValueError("capture needs a 32-bit display")
+        self.path = path
+        self.fps = fps
+        width, height = surface.get_size()
+        self.frame_bytes = surface.get_pitch() * height
+        self.memory = shared_memory.SharedMemory(create=True, size=self.frame_bytes * pool)
+        self.buffers = [np.ndarray(self.frame_bytes, np.uint8, self.memory.buf, i * self.frame_bytes)
+                        for i in range(pool)]
+        # The encoder must not inherit the game's display and audio, so it starts fresh
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.free = context.Queue()
+        self.results = context.Queue()
+        for i in range(pool):
+            self.free.put(i)
+        settings = {
+            "path": path, "fps": fps, "size": (width, height), "pitch": surface.get_pitch(),
+            "order": pixel_order(surface), "memory": self.memory.name, "frame_bytes": self.frame_bytes,
+            "ffmpeg": find_ffmpeg(),
+        }
+        self.encoder = context.Process(target=encode, args=(settings, self.queue, self.free, self.results),
+                                       name="capture-encoder", daemon=True)
+        self.encoder.start()
+        self.start = time.perf_counter()
+        self.next_frame = 0
+        self.captured = 0
+        self.dropped = 0
+
+    def capture(self, surface):
+        """Copy surface if a new frame is due; never waits"""
+        number = int((time.perf_counter() - self.start) * self.fps)
+        if number < self.next_frame:
+            return
+        self.next_frame = number + 1
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        self.buffers[slot][:] = np.frombuffer(surface.get_buffer(), np.uint8)
+        self.queue.put(("frame", slot, number))
+        self.captured += 1
+
+    def sound(self, path, volume=1.0, loop=False):
+        """Mix the sound file at path into the audio from now on, looping it with loop"""
+        self.queue.put(("sound", path, time.perf_counter() - self.start, volume, loop))
+
+    def close(self):
+        """Wait for the encoder to finish the file"""
+        self.queue.put(None)
+        while True:
+            try:
+                result = self.results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not self.encoder.is_alive():
+                    result = {"error": f"the encoder exited with status {self.encoder.exitcode}"}
+                    break
+        self.encoder.join()
+        del self.buffers
+        self.memory.close()
+        self.memory.unlink()
+        if "error" in result:
+            print(f"Capture to {self.path} failed: {result['error']}")
+        else:
+            print(f"Captured {self.captured} frames to {self.path} in {result['seconds']:.1f} s, "
+                  f"{self.dropped} dropped while encoding fell behind")
+
+class VideoWriter:
+    """Pipes raw frames to ffmpeg, then muxes in the audio"""
+    def __init__(self, settings):
+        self.path = settings["path"]
+        root, extension = os.path.splitext(self.path)
+        self.video_path = f"{root}.video{extension}"
+        self.ffmpeg = settings["ffmpeg"]
+        width, height = settings["size"]
+        self.process = subprocess.Popen(
+            [self.ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", settings["order"],
+             "-s", f"{width}x{height}", "-r", str(settings["fps"]), "-i", "-",
+             "-pix_fmt", "yuv420p", self.video_path],
+            stdin=subprocess.PIPE)
+
+    def write(self, pixels, number):
+        self.process.stdin.write(pixels.data)
+
+    def finish(self, audio):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f"ffmpeg exited with status {self.process.returncode}")
+        if audio is None:
+            os.replace(self.video_path, self.path)
+            return
+        audio_path = f"{os.path.splitext(self.path)[0]}.wav"
+        write_wav(audio_path, audio)
+        subprocess.run([self.ffmpeg, "-loglevel", "error", "-y", "-i", self.video_path, "-i", audio_path,
+                        "-c:v", "copy", "-shortest", self.path], check=True)
+        os.remove(self.video_path)
+        os.remove(audio_path)
+
+class PngWriter:
+    """Writes frame_NNNNNN.png files numbered by time, and audio.wav, into a directory"""
+    def __init__(self, settings):
+        import pygame
+        self.pygame = pygame
+        self.directory = settings["path"]
+        self.size = settings["size"]
+        self.channels = [settings["order"].index(letter) for letter in "rgb"]
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, pixels, number):
+        rgb = np.ascontiguousarray(pixels[:, :, self.channels])
+        image = self.pygame.image.frombuffer(rgb, self.size, "RGB")
+        self.pygame.image.save(image, os.path.join(self.directory, f"frame_{number:06d}.png"))
+
+    def finish(self, audio):
+        if audio is not None:
+            write_wav(os.path.join(self.directory, "audio.wav"), audio)
+
+def write_wav(path, audio):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(AUDIO_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+
+def mix_sounds(events, seconds):
+    """Stereo float audio of the (path, time, volume, loop) events, seconds long"""
+    import pygame
+    os.environ["SDL_AUDIODRIVER"] = "dummy"  # Only decodes, never plays
+    pygame.mixer.init(AUDIO_RATE, -16, 2)
+    audio = np.zeros((int(seconds * AUDIO_RATE), 2), np.float32)
+    decoded = {}
+    for path, start, volume, loop in events:
+        if path not in decoded:
+            samples = pygame.sndarray.array(pygame.mixer.Sound(path)).astype(np.float32) / 32768
+            decoded[path] = samples.reshape(len(samples), -1)
+        samples = decoded[path]
+        begin = int(start * AUDIO_RATE)
+        end = len(audio) if loop else min(begin + len(samples), len(audio))
+        if end > begin:
+            repeats = -(-(end - begin) // len(samples))
+            audio[begin:end] += volume * np.tile(samples, (repeats, 1))[:end - begin]
+    return audio
+
+def encode(settings, frames, free, results):
+    """Encoder process: write queued frames until None arrives, then the audio"""
+    begin = time.perf_counter()
+    memory = shared_memory.SharedMemory(name=settings["memory"])
+    width, height = settings["size"]
+    pitch, frame_bytes = settings["pitch"], settings["frame_bytes"]
+    try:
+        writer = VideoWriter(settings) if is_video(settings["path"]) else PngWriter(settings)
+        sounds = []
+        last = None
+        number = -1
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            if item[0] == "sound":
+                sounds.append(item[1:])
+                continue
+            _, slot, number = item
+            buffer = np.ndarray(frame_bytes, np.uint8, memory.buf, slot * frame_bytes)
+            pixels = buffer.reshape(height, pitch)[:, :width * 4].reshape(height, width, 4)
+            if isinstance(writer, VideoWriter):
+                # Repeat the last frame over any missed, so the video keeps real time
+                if last is not None:
+                    for _ in range(number - last[0] - 1):
+                        writer.write(last[1], None)
+                last = (number, pixels.copy())
+                writer.write(last[1], number)
+            else:
+                writer.write(pixels, number)
+            del buffer, pixels
+            free.put(slot)
+        audio = mix_sounds(sounds, (number + 1) / settings["fps"]) if sounds and number >= 0 else None
+        writer.finish(audio)
+        results.put({"seconds": time.perf_counter() - begin})
+    except Exception as error:
+        results.put({"error": str(error)})
+    finally:
+        memory.close()
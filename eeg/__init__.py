@@ -0,0 +1,10 @@
+"""EEG acquisition and feature extraction for brain-controlled sessions."""
+from .acquisition import AcquisitionThread, EEGState, SampleQueue
+from .blinks import BlinkDetector, BlinkWindow
+from .calibration import calibrate, load_profile, save_profile
+from .features import BANDS, BandPowerEstimator, CalmScore, relaxation_ratio
+from .filters import StreamingFilter, design_eeg_filter
+from .pipeline import EEGPipeline
+from .playback import FileSource, write_neeg
+from .ringbuffer import RingBuffer
+from .sources import NetworkSource, SyntheticSource, is_recording, open_source
@@ -0,0 +1,112 @@
+"""Device reading and feature extraction on a thread of their own.
+
+The render loop never waits on the device: it reads the latest EEGState,
+which the acquisition thread replaces as a whole with a single reference
+assignment, and drains raw samples from a bounded single-producer /
+single-consumer queue. Neither side takes a lock.
+"""
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .pipeline import EEGPipeline
+
+# blinks counts every blink since connecting, so readers tell new ones by the difference;
+# error is None while the thread is running, else why it stopped
+EEGState = namedtuple("EEGState", ["calm", "band_power", "blinks", "samples", "time", "error"])
+
+class SampleQueue:
+    """Bounded single-producer / single-consumer queue of samples.
+
+    Only the producer advances written and only the consumer advances
+    consumed, each after it is done with the rows involved, so the two
+    counters are all the threads share. A full queue drops the newest
+    samples and counts them.
+    """
+    def __init__(self, capacity, channels):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, channels), dtype=np.float32)
+        self.written = 0   # Producer side
+        self.dropped = 0   # Producer side
+        self.max_depth = 0  # Producer side
+        self.consumed = 0  # Consumer side
+
+    def depth(self):
+        return self.written - self.consumed
+
+    def push(self, samples):
+        """Producer: append as many samples as fit"""
+        free = self.capacity - (self.written - self.consumed)
+        if len(samples) > free:
+            self.dropped += len(samples) - free
+            samples = samples[:free]
+        start = self.written % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+        self.max_depth = max(self.max_depth, self.written - self.consumed)
+
+    def pop_all(self):
+        """Consumer: take every queued sample, oldest first"""
+        written = self.written
+        count = written - self.consumed
+        start = self.consumed % self.capacity
+        first = min(count, self.capacity - start)
+        samples = np.concatenate((self.data[start:start + first], self.data[:count - first]))
+        self.consumed = written
+        return samples
+
+class AcquisitionThread:
+    """Reads a source every poll_seconds, publishing the derived state and queueing raw samples"""
+    def __init__(self, source, queue_seconds=2.0, poll_seconds=0.004, mains_hz=50, calm_range=None):
+        self.source = source
+        self.pipeline = EEGPipeline(source, mains_hz=mains_hz, calm_range=calm_range)
+        # Recordings played faster than real time deliver proportionally more per second
+        speed = max(getattr(source, "speed", 1.0), 1.0)
+        self.queue = SampleQueue(int(source.rate * queue_seconds * speed), source.channels)
+        self.poll_seconds = poll_seconds
+        self.state = EEGState(0.0, self.pipeline.band_power, 0, 0, time.perf_counter(), None)
+        self.stopping = threading.Event()
+        self.finished = False  # Set once a recording has been played to the end and processed
+        self.failed = False  # Set, with finished, if reading or processing raised, which stops the thread
+        self.thread = threading.Thread(target=self.run, name="eeg-acquisition", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            while not self.stopping.is_set():
+                samples = self.source.read()
+                if len(samples):
+                    self.queue.push(samples)
+                    self.pipeline.process(samples)
+                    self.state = EEGState(self.pipeline.calm_level, self.pipeline.band_power,
+                                          self.pipeline.blink_count, self.pipeline.buffer.total,
+                                          time.perf_counter(), None)
+                if getattr(self.source, "finished", False):
+                    self.finished = True
+                self.stopping.wait(self.poll_seconds)
+        except Exception as e:
+            # Calm drops to nothing rather than staying at its last level while nothing updates it
+            self.state = self.state._replace(calm=0.0, time=time.perf_counter(),
+                                             error=f"{type(e).__name__}: {e}")
+            self.failed = True
+            self.finished = True  # Nothing more will come, as at the end of a recording
+
+    def metrics(self):
+        return {
+            "samples": self.state.samples,
+            "blinks": self.state.blinks,
+            "queue_depth": self.queue.depth(),
+            "max_queue_depth": self.queue.max_depth,
+            "dropped": self.queue.dropped + getattr(self.source, "dropped", 0),
+            "errors": getattr(self.source, "errors", 0),
+            "error": self.state.error,
+        }
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join()
+        self.source.close()
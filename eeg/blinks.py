@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+
+FRONTAL_CHANNELS = (0, 1)  # Fp1 and Fp2 in the usual montage, where blinks show strongest
+
+class BlinkDetector:
+    """Finds blinks as large deflections on the frontal channels.
+
+    Each chunk is compared against a slowly tracked baseline in one
+    vectorized pass; a blink is a rise above threshold, and rises within
+    refractory_seconds of the previous blink belong to the same one.
+    """
+    def __init__(self, rate, channels, threshold=60.0, refractory_seconds=0.3, baseline_seconds=2.0):
+        self.rate = rate
+        self.frontal = [c for c in FRONTAL_CHANNELS if c < channels] or [0]
+        self.threshold = threshold
+        self.refractory = int(rate * refractory_seconds)
+        self.baseline_samples = rate * baseline_seconds
+        self.baseline = None
+        self.above = False           # Whether the last sample of the previous chunk was above threshold
+        self.last_blink = -self.refractory  # Sample index of the last blink
+        self.total = 0               # Samples seen
+        self.count = 0               # Blinks found
+
+    def process(self, samples):
+        """Return the sample indices of blinks starting in this chunk"""
+        if not len(samples):
+            return np.empty(0, dtype=np.int64)
+        frontal = samples[:, self.frontal]
+        means = frontal.mean(axis=0)
+        if self.baseline is None:
+            self.baseline = means
+        amplitude = (frontal - self.baseline).mean(axis=1)
+        # Follow electrode drift, slowly enough that a blink barely moves it
+        weight = 1 - math.exp(-len(samples) / self.baseline_samples)
+        self.baseline = self.baseline + (means - self.baseline) * weight
+
+        above = amplitude > self.threshold
+        rises = np.flatnonzero(above & ~np.concatenate(([self.above], above[:-1]))) + self.total
+        self.above = bool(above[-1])
+        self.total += len(samples)
+        blinks = []
+        for onset in rises.tolist():  # At most a few per chunk
+            if onset - self.last_blink >= self.refractory:
+                blinks.append(onset)
+                self.last_blink = onset
+        self.count += len(blinks)
+        return np.array(blinks, dtype=np.int64)
+
+class BlinkWindow:
+    """Times of the most recent blinks in a fixed ring, to tell a calm
+    blinking rate from a stressed one in constant time.
+
+    Only the last limit + 1 blinks matter: the rate is too high exactly
+    when the oldest of them is still within seconds of the newest.
+    """
+    def __init__(self, seconds=3.0, limit=4):
+        self.seconds = seconds
+        self.times = np.full(limit + 1, -np.inf)
+        self.next = 0
+
+    def add(self, t):
+        """Record a blink at time t, returning True if that makes more than limit within seconds"""
+        self.times[self.next] = t
+        self.next = (self.next + 1) % len(self.times)
+        # self.next now points at the oldest of the last limit + 1 blinks
+        return t - self.times[self.next] < self.seconds
+
+    def clear(self):
+        self.times.fill(-np.inf)
+        self.next = 0
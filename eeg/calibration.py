@@ -0,0 +1,71 @@
+"""Per-user resting baseline.
+
+A calibration records a minute or two of rest and, in one Welch-style pass
+(Hann-windowed 2-second segments overlapping by half, all transformed in a
+single batched FFT), measures how that user's relaxation ratio is
+distributed. The resulting profile is a small JSON file, so loading it is
+instant and returning users skip recalibrating.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from .features import BANDS, BandPowerEstimator, relaxation_ratio
+from .filters import StreamingFilter, design_eeg_filter
+
+PROFILE_VERSION = 1
+MIN_SECONDS, MAX_SECONDS = 60, 120
+MIN_SPREAD = 0.1  # Narrowest ratio range the calm score is spread over
+
+def welch_band_powers(samples, rate, segment_seconds=2.0, overlap=0.5):
+    """Band powers of every segment of samples, (segments, channels, bands)"""
+    estimator = BandPowerEstimator(rate, segment_seconds, segment_seconds * (1 - overlap))
+    count = (len(samples) - estimator.window) // estimator.hop + 1
+    if count < 1:
+        raise ValueError(f"need at least {segment_seconds} s of samples, got {len(samples) / rate:.1f} s")
+    return estimator.compute(samples[:estimator.window + (count - 1) * estimator.hop])
+
+def calibrate(samples, rate, mains_hz=50):
+    """Profile of a resting recording of raw (samples, channels) data.
+
+    The calm score is spread between the 10th and 90th percentile of the
+    resting relaxation ratio, so resting sits mid-scale: relaxing beyond
+    the user's own usual level speeds growth up and tension slows it.
+    """
+    filtered = StreamingFilter(design_eeg_filter(rate, mains_hz)).process(samples)
+    band_power = welch_band_powers(filtered, rate)
+    ratios = relaxation_ratio(band_power)
+    p10, p50, p90 = np.percentile(ratios, [10, 50, 90])
+    if p90 - p10 < MIN_SPREAD:
+        p10, p90 = p50 - MIN_SPREAD / 2, p50 + MIN_SPREAD / 2
+    median_power = np.median(band_power, axis=0)  # Robust to the odd blink
+    return {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": round(len(samples) / rate, 1),
+        "rate": rate,
+        "channels": samples.shape[1],
+        "segments": len(ratios),
+        "band_power": {band: median_power[:, i].tolist() for i, band in enumerate(BANDS)},
+        "ratio_percentiles": {"10": float(p10), "50": float(p50), "90": float(p90)},
+        "calm_low": float(max(p10, 0.0)),
+        "calm_high": float(min(p90, 1.0)),
+    }
+
+def save_profile(path, profile):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_profile(path):
+    """The stored profile, or None if there is none or it is unreadable"""
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == PROFILE_VERSION else None
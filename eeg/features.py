@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Frequency bands in Hz, [low, high)
+BANDS = {
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 13.0),
+    "beta": (13.0, 30.0),
+}
+
+class BandPowerEstimator:
+    """Band powers of sliding Hann-windowed FFT windows.
+
+    compute() takes every window that became complete since the last call
+    and transforms them in one batched rfft over all channels.
+    """
+    def __init__(self, rate, window_seconds=2.0, hop_seconds=0.25):
+        self.rate = rate
+        self.window = int(rate * window_seconds)
+        self.hop = max(1, int(rate * hop_seconds))
+        self.taper = np.hanning(self.window).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.window, 1 / rate)
+        # One row per band selecting its FFT bins, so summing is a matrix product
+        self.band_matrix = np.array([(freqs >= low) & (freqs < high) for low, high in BANDS.values()],
+                                    dtype=np.float32).T
+
+    def compute(self, block):
+        """Band powers of the windows in block, one window every hop samples.
+
+        block is (window + (n - 1) * hop, channels); returns (n, channels, bands).
+        """
+        windows = sliding_window_view(block, self.window, axis=0)[::self.hop]  # (n, channels, window)
+        spectra = np.fft.rfft(windows * self.taper, axis=-1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        return power @ self.band_matrix
+
+def relaxation_ratio(band_power):
+    """Alpha share of theta + alpha + beta power, averaged over channels"""
+    theta, alpha, beta = (band_power[..., i] for i in range(len(BANDS)))
+    return (alpha / np.maximum(theta + alpha + beta, 1e-12)).mean(axis=-1)
+
+class CalmScore:
+    """Maps the relaxation ratio onto 0-1 between low and high, smoothed over time"""
+    def __init__(self, low=0.2, high=0.7, smoothing_seconds=2.0):
+        self.low = low
+        self.high = high
+        self.smoothing_seconds = smoothing_seconds
+        self.level = 0.0
+
+    def set_range(self, low, high):
+        """Ratios mapped to 0 and 1, e.g. from a calibration profile"""
+        self.low, self.high = low, high
+
+    def update(self, ratios, hop_seconds):
+        """Fold in one ratio per hop, oldest first, returning the smoothed level"""
+        weight = 1 - math.exp(-hop_seconds / self.smoothing_seconds)
+        targets = np.clip((np.asarray(ratios) - self.low) / (self.high - self.low), 0, 1)
+        for target in targets.tolist():
+            self.level += (target - self.level) * weight
+        return self.level
@@ -0,0 +1,122 @@
+"""Streaming IIR filtering in pure NumPy.
+
+Filters are cascades of second-order sections, one row (b0, b1, b2, a0, a1, a2)
+per section as in scipy's sos format. Running the recursion sample by sample
+in Python is far too slow, so StreamingFilter treats the whole cascade as one
+linear state-space system: for a block of n samples the outputs are a matrix
+product of the inputs with the impulse response plus a product of the carried
+state, for every channel at once, and the state carried into the next chunk
+comes out the same way.
+"""
+import math
+
+import numpy as np
+
+def notch(freq, rate, q=30.0):
+    """Section removing a narrow band around freq"""
+    w = 2 * math.pi * freq / rate
+    alpha = math.sin(w) / (2 * q)
+    return normalize([1, -2 * math.cos(w), 1, 1 + alpha, -2 * math.cos(w), 1 - alpha])
+
+def butterworth(kind, freq, rate, order=2):
+    """Sections of an even-order Butterworth "lowpass" or "highpass" filter"""
+    w = 2 * math.pi * freq / rate
+    sections = []
+    for k in range(order // 2):
+        # Each pole pair of the analog prototype becomes a biquad with its own Q
+        q = 1 / (2 * math.cos((2 * k + 1) * math.pi / (2 * order)))
+        alpha = math.sin(w) / (2 * q)
+        cos_w = math.cos(w)
+        if kind == "lowpass":
+            b = [(1 - cos_w) / 2, 1 - cos_w, (1 - cos_w) / 2]
+        else:
+            b = [(1 + cos_w) / 2, -(1 + cos_w), (1 + cos_w) / 2]
+        sections.append(normalize(b + [1 + alpha, -2 * cos_w, 1 - alpha]))
+    return sections
+
+def normalize(section):
+    b0, b1, b2, a0, a1, a2 = section
+    return [b0 / a0, b1 / a0, b2 / a0, 1.0, a1 / a0, a2 / a0]
+
+def design_eeg_filter(rate, mains_hz=50, low_hz=0.5, high_hz=40.0):
+    """Mains notch plus a 0.5-40 Hz bandpass, leaving out anything at or above Nyquist.
+    The low edge is kept under 1 Hz so blinks, mostly 0.5-3 Hz, survive for the blink detector."""
+    nyquist = rate / 2
+    sections = []
+    if mains_hz and mains_hz < nyquist:
+        sections.append(notch(mains_hz, rate))
+    if low_hz:
+        sections += butterworth("highpass", low_hz, rate, order=2)
+    if high_hz and high_hz < nyquist:
+        sections += butterworth("lowpass", high_hz, rate, order=4)
+    return np.array(sections)
+
+def state_space(sos):
+    """(A, B, C, D) of the cascade, each section in transposed direct form II"""
+    A, B, C, D = np.zeros((0, 0)), np.zeros(0), np.zeros(0), 1.0
+    for b0, b1, b2, _, a1, a2 in sos:
+        As = np.array([[-a1, 1.0], [-a2, 0.0]])
+        Bs = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        Cs = np.array([1.0, 0.0])
+        # This section's input is the output of everything before it
+        n = len(B)
+        A = np.block([[A, np.zeros((n, 2))], [np.outer(Bs, C), As]])
+        B = np.concatenate((B, Bs * D))
+        C = np.concatenate((b0 * C, Cs))
+        D = b0 * D
+    return A, B, C, D
+
+class StreamingFilter:
+    """Applies an sos cascade to (samples, channels) chunks of any length,
+    carrying the filter state from one chunk to the next.
+
+    Chunks are processed block samples at a time. The first sample sets the
+    state as if it had been the input forever, so an electrode's DC offset
+    doesn't ring through the filter at startup.
+    """
+    def __init__(self, sos, block=64):
+        A, B, C, D = state_space(np.asarray(sos, dtype=np.float64))
+        order = len(B)
+        self.block = block
+        # powers[n] = A^n, gains[n] = A^n B, responses[n] = C A^n
+        self.powers = np.empty((block + 1, order, order))
+        self.powers[0] = np.eye(order)
+        for n in range(block):
+            self.powers[n + 1] = A @ self.powers[n]
+        self.gains = self.powers[:block] @ B
+        self.responses = self.powers[:block].transpose(0, 2, 1) @ C
+        impulse = np.concatenate(([D], self.responses[:block - 1] @ B))
+        lags = np.arange(block)[:, np.newaxis] - np.arange(block)
+        self.toeplitz = np.where(lags >= 0, impulse[np.clip(lags, 0, None)], 0.0)
+        # State a constant input settles to, per unit of input
+        self.steady_state = np.linalg.solve(np.eye(order) - A, B) if order else B
+        self.state = None
+
+    def reset(self):
+        self.state = None
+
+    def process(self, samples):
+        """Filtered copy of a (samples, channels) chunk"""
+        x = np.asarray(samples, dtype=np.float64)
+        out = np.empty(x.shape, dtype=np.float32)
+        if not len(x):
+            return out
+        if self.state is None:
+            self.state = np.outer(self.steady_state, x[0])
+        for start in range(0, len(x), self.block):
+            chunk = x[start:start + self.block]
+            n = len(chunk)
+            out[start:start + n] = self.toeplitz[:n, :n] @ chunk + self.responses[:n] @ self.state
+            self.state = self.powers[n] @ self.state + self.gains[n - 1::-1].T @ chunk
+        return out
+
+def filter_reference(sos, samples):
+    """Direct sample-by-sample cascade, slow but obviously right, for checking StreamingFilter"""
+    y = np.array(samples, dtype=np.float64)
+    for b0, b1, b2, _, a1, a2 in sos:
+        s1 = s2 = np.zeros(y.shape[1:])
+        for i in range(len(y)):
+            x = y[i].copy()
+            y[i] = b0 * x + s1
+            s1, s2 = b1 * x - a1 * y[i] + s2, b2 * x - a2 * y[i]
+    return y
@@ -0,0 +1,53 @@
+import numpy as np
+
+from .blinks import BlinkDetector
+from .features import BandPowerEstimator, CalmScore, relaxation_ratio
+from .filters import StreamingFilter, design_eeg_filter
+from .ringbuffer import RingBuffer
+
+class EEGPipeline:
+    """Samples at source's rate and channel count -> notch and bandpass filter
+    -> ring buffer -> band powers every hop -> calm level (0-1), with blinks
+    detected on the frontal channels as filtered samples arrive. Reading the
+    source is left to AcquisitionThread."""
+    def __init__(self, source, buffer_seconds=10.0, window_seconds=2.0, hop_seconds=0.25, mains_hz=50,
+                 calm_range=None):
+        self.filter = StreamingFilter(design_eeg_filter(source.rate, mains_hz))
+        self.buffer = RingBuffer(int(source.rate * buffer_seconds), source.channels)
+        self.bands = BandPowerEstimator(source.rate, window_seconds, hop_seconds)
+        self.calm = CalmScore()
+        if calm_range:
+            self.calm.set_range(*calm_range)
+        self.blinks = BlinkDetector(source.rate, source.channels)
+        self.hop_seconds = self.bands.hop / source.rate
+        self.next_window_end = self.bands.window  # Absolute sample index the next window ends at
+        self.band_power = np.zeros((source.channels, 3), dtype=np.float32)
+
+    @property
+    def calm_level(self):
+        return self.calm.level
+
+    @property
+    def blink_count(self):
+        return self.blinks.count
+
+    def process(self, samples):
+        """Buffer samples and score every window completed since the last call"""
+        if len(samples):
+            samples = self.filter.process(samples)
+            self.buffer.write(samples)
+            self.blinks.process(samples)
+        total = self.buffer.total
+        if total < self.next_window_end:
+            return
+        window, hop = self.bands.window, self.bands.hop
+        # Windows that already left the buffer are skipped
+        oldest_end = total - len(self.buffer) + window
+        if self.next_window_end < oldest_end:
+            self.next_window_end += -(-(oldest_end - self.next_window_end) // hop) * hop
+        count = (total - self.next_window_end) // hop + 1
+        last_end = self.next_window_end + (count - 1) * hop
+        band_power = self.bands.compute(self.buffer.ending_at(last_end, window + (count - 1) * hop))
+        self.calm.update(relaxation_ratio(band_power), self.hop_seconds)
+        self.band_power = band_power[-1]
+        self.next_window_end = last_end + hop
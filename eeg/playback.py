@@ -0,0 +1,193 @@
+"""Playback of recorded EEG as a live source.
+
+Two formats are read, both through a memory map a chunk at a time and
+with pages dropped once played, so a recording hours long costs no more
+memory than a minute of it:
+
+- CSV with one column per channel, optionally a header row, and optionally
+  a leading time/timestamp column that is skipped. CSV carries no sample
+  rate, so it is given separately.
+- NEEG, a minimal EDF-like binary: the magic b"NEEG", a little-endian
+  uint32 header length, a JSON header ({"rate", "channels", "labels",
+  "units"}) padded with spaces to a multiple of 4 bytes, then the samples
+  as interleaved little-endian float32.
+"""
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"NEEG"
+TIME_COLUMNS = ("t", "time", "timestamp", "seconds")
+CSV_BLOCK_BYTES = 1 << 16  # Parsed per refill
+MAX_CHUNK_SECONDS = 1.0  # Most playback time one read() catches up on
+RELEASE_BYTES = 1 << 20  # Played data dropped from memory in steps of this much
+
+class MappedFile:
+    """Read-only memory map of a file that forgets pages it has been told are played"""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.released = 0
+
+    def __len__(self):
+        return len(self.map)
+
+    def played(self, offset):
+        """Everything before offset has been read and copied out"""
+        offset -= offset % mmap.PAGESIZE
+        if offset - self.released >= RELEASE_BYTES and hasattr(mmap, "MADV_DONTNEED"):
+            self.map.madvise(mmap.MADV_DONTNEED, self.released, offset - self.released)
+            self.released = offset
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+def write_neeg(path, samples, rate, labels=None):
+    """Write (samples, channels) data as a NEEG recording"""
+    samples = np.asarray(samples, dtype="<f4")
+    header = {
+        "rate": rate,
+        "channels": samples.shape[1],
+        "labels": labels or [f"ch{i + 1}" for i in range(samples.shape[1])],
+        "units": "uV",
+    }
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % 4)
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        f.write(samples.tobytes())
+
+class NeegReader:
+    """Rows of a NEEG file, copied out of a memory map"""
+    def __init__(self, path):
+        self.file = MappedFile(path)
+        start = self.file.map[:len(MAGIC) + 4]
+        if len(start) < len(MAGIC) + 4 or start[:len(MAGIC)] != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a NEEG recording")
+        header_length, = struct.unpack("<I", start[len(MAGIC):])
+        self.offset = len(MAGIC) + 4 + header_length
+        self.header = json.loads(self.file.map[len(MAGIC) + 4:self.offset])
+        self.rate = self.header["rate"]
+        self.channels = self.header["channels"]
+        self.row_bytes = 4 * self.channels
+        self.rows = (len(self.file) - self.offset) // self.row_bytes
+        self.position = 0
+
+    def take(self, count):
+        count = min(count, self.rows - self.position)
+        start = self.offset + self.position * self.row_bytes
+        rows = np.frombuffer(self.file.map[start:start + count * self.row_bytes], dtype="<f4")
+        self.position += count
+        self.file.played(start + count * self.row_bytes)
+        return rows.reshape(count, self.channels).astype(np.float32)
+
+    def close(self):
+        self.file.close()
+
+class CsvReader:
+    """Rows of a CSV file, parsed a block at a time from a memory map"""
+    def __init__(self, path):
+        self.path = path
+        self.file = MappedFile(path)
+        self.map = self.file.map
+        first_end = self.map.find(b"\n")
+        first_line = self.map[:first_end if first_end >= 0 else len(self.map)].decode().strip()
+        names = [name.strip().lower() for name in first_line.split(",")]
+        try:
+            [float(name) for name in names]
+            self.offset = 0
+        except ValueError:
+            self.offset = first_end + 1  # Header row
+        self.line = 1 if self.offset == 0 else 2  # Line number the next block starts at
+        self.columns = list(range(1 if names[0] in TIME_COLUMNS else 0, len(names)))
+        self.channels = len(self.columns)
+        self.pending = np.zeros((0, self.channels), dtype=np.float32)
+
+    def refill(self):
+        """Parse the next block of whole lines, returning False at the end of the file"""
+        if self.offset >= len(self.map):
+            return False
+        end = min(self.offset + CSV_BLOCK_BYTES, len(self.map))
+        if end < len(self.map):
+            end = self.map.rfind(b"\n", self.offset, end) + 1 or len(self.map)
+        block = self.map[self.offset:end]
+        self.offset = end
+        self.file.played(end)
+        try:
+            rows = self.parse(block)
+        except ValueError:
+            self.raise_bad_line(block)
+        self.line += block.count(b"\n")
+        self.pending = np.concatenate((self.pending, rows))
+        return True
+
+    def parse(self, block):
+        return np.loadtxt(io.BytesIO(block), delimiter=",", usecols=self.columns, dtype=np.float32, ndmin=2)
+
+    def raise_bad_line(self, block):
+        """Find the line of block that does not parse and raise its error with the line number"""
+        for number, line in enumerate(block.split(b"\n"), self.line):
+            try:
+                self.parse(line)
+            except ValueError as e:
+                # NumPy's own row count is within the one line
+                raise ValueError(f"{self.path} line {number}: {re.sub(r' at row [0-9]+', '', str(e))}") from None
+        raise ValueError(f"{self.path}: cannot parse the lines from line {self.line}")
+
+    def take(self, count):
+        while len(self.pending) < count and self.refill():
+            pass
+        rows, self.pending = self.pending[:count], self.pending[count:]
+        return rows
+
+    def close(self):
+        self.file.close()
+
+class FileSource:
+    """A recording played back as if it were streaming, speed times faster than real time.
+
+    A reader that falls behind pauses the playback rather than skipping
+    samples. finished turns True once the last sample has been read.
+    """
+    def __init__(self, path, rate=250, speed=1.0):
+        if path.lower().endswith(".csv"):
+            self.reader = CsvReader(path)
+            self.rate = rate
+        else:
+            self.reader = NeegReader(path)
+            self.rate = self.reader.rate
+        self.channels = self.reader.channels
+        self.speed = speed
+        self.description = f"{os.path.basename(path)} {self.rate} Hz x {self.channels} ch"
+        if speed != 1:
+            self.description += f" at {speed:g}x"
+        self.start = None
+        self.sent = 0
+        self.finished = False
+
+    def read(self):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        due = int((now - self.start) * self.rate * self.speed) - self.sent
+        backlog = int(MAX_CHUNK_SECONDS * self.rate * max(self.speed, 1))
+        if due > backlog:
+            # Pause instead of dropping what was not read in time
+            self.start += (due - backlog) / (self.rate * self.speed)
+            due = backlog
+        samples = self.reader.take(due)
+        self.sent += len(samples)
+        if len(samples) < due:
+            self.finished = True
+        return samples
+
+    def close(self):
+        self.reader.close()
@@ -0,0 +1,43 @@
+import numpy as np
+
+class RingBuffer:
+    """Fixed-capacity buffer of multichannel samples, allocated once.
+
+    Every sample is written twice, capacity rows apart, so any run of recent
+    samples is one contiguous slice and reading a window never copies.
+    """
+    def __init__(self, capacity, channels, dtype=np.float32):
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((2 * capacity, channels), dtype=dtype)
+        self.head = 0   # Row the next sample goes to
+        self.total = 0  # Samples written since creation
+
+    def write(self, samples):
+        """Append a (samples, channels) block, overwriting the oldest rows"""
+        count = len(samples)
+        self.total += count
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+            count = self.capacity
+        first = min(count, self.capacity - self.head)
+        rest = count - first
+        for offset in (0, self.capacity):
+            self.data[offset + self.head:offset + self.head + first] = samples[:first]
+            self.data[offset:offset + rest] = samples[first:]
+        self.head = (self.head + count) % self.capacity
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def ending_at(self, sample, count):
+        """View of the count samples before absolute sample index sample"""
+        back = self.total - sample
+        if back < 0 or back + count > len(self):
+            raise IndexError(f"samples {sample - count}-{sample} are not in the buffer")
+        end = self.head + self.capacity - back
+        return self.data[end - count:end]
+
+    def latest(self, count):
+        """View of the newest count samples, oldest first"""
+        return self.ending_at(self.total, count)
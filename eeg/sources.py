@@ -0,0 +1,190 @@
+"""Sample sources. Each has rate, channels and description attributes, a
+non-blocking read() returning a float32 (samples, channels) array of whatever
+arrived since the previous call, and close()."""
+import math
+import socket
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .blinks import FRONTAL_CHANNELS
+from .playback import FileSource
+
+MAX_BACKLOG_SECONDS = 1.0  # Older unread samples are dropped, as a device's own buffer would
+
+class SyntheticSource:
+    """EEG-like test signal generated in real time, for working without a headset.
+
+    Alpha rises and beta falls with a calm level that swings between tense
+    and relaxed every period_seconds, over theta and white noise. Blinks
+    show on the frontal channels, more often the more tense it is, and like
+    a real headset every channel carries an electrode offset and mains hum.
+    """
+    BLINK_AMPLITUDE = 150.0  # Microvolts, several times the background activity
+    BLINK_SECONDS = 0.3
+    MAINS_HZ = 50
+    def __init__(self, rate=250, channels=8, seed=None, period_seconds=40.0):
+        self.rate = rate
+        self.channels = channels
+        self.period_seconds = period_seconds
+        self.description = f"synthetic {rate} Hz x {channels} ch"
+        self.rng = np.random.default_rng(seed)
+        self.phases = self.rng.uniform(0, 2 * math.pi, (3, channels))
+        self.offsets = self.rng.uniform(-300, 300, channels)  # Microvolts of DC, different per electrode
+        self.start = None
+        self.sent = 0
+        self.dropped = 0
+        self.blink_onsets = []  # Sample indices of blinks that may still be in progress
+        self.next_blink = self.blink_interval(0)
+        self.blink_length = int(rate * self.BLINK_SECONDS)
+        self.blink_channels = list(FRONTAL_CHANNELS[:channels])
+
+    def blink_interval(self, sample):
+        """Samples until the blink after one at sample: about 15 a minute when
+        relaxed and 90 when tense, never closer than 0.4 seconds"""
+        blinks_per_second = 0.25 + 1.25 * (1 - self.calm_at(sample / self.rate))
+        return sample + int((0.4 + self.rng.exponential(1 / blinks_per_second)) * self.rate)
+
+    def calm_at(self, t):
+        return 0.5 - 0.45 * np.cos(2 * math.pi * t / self.period_seconds)
+
+    def read(self):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        due = int((now - self.start) * self.rate) - self.sent
+        backlog = int(MAX_BACKLOG_SECONDS * self.rate)
+        if due > backlog:
+            self.sent += due - backlog
+            self.dropped += due - backlog
+            due = backlog
+        return self.generate(due)
+
+    def generate(self, count):
+        """The next count samples, whatever the time"""
+        t = ((self.sent + np.arange(count)) / self.rate)[:, np.newaxis]
+        self.sent += count
+        calm = self.calm_at(t)
+        samples = (
+            6 * np.sin(2 * math.pi * 6 * t + self.phases[0])                    # Theta
+            + (5 + 15 * calm) * np.sin(2 * math.pi * 10 * t + self.phases[1])   # Alpha
+            + (10 - 6 * calm) * np.sin(2 * math.pi * 20 * t + self.phases[2])   # Beta
+            + self.rng.normal(0, 3, (count, self.channels))
+            + 20 * np.sin(2 * math.pi * self.MAINS_HZ * t)                      # Mains hum
+            + self.offsets
+        )
+        self.add_blinks(samples, self.sent - count)
+        return samples.astype(np.float32)
+
+    def add_blinks(self, samples, first):
+        """Add a half-sine deflection for every blink overlapping samples first onwards"""
+        end = first + len(samples)
+        while self.next_blink < end:
+            self.blink_onsets.append(self.next_blink)
+            self.next_blink = self.blink_interval(self.next_blink)
+        for onset in self.blink_onsets:
+            start, stop = max(onset, first), min(onset + self.blink_length, end)
+            if start < stop:
+                phase = np.arange(start - onset, stop - onset) * (math.pi / self.blink_length)
+                samples[start - first:stop - first, self.blink_channels] += \
+                    self.BLINK_AMPLITUDE * np.sin(phase)[:, np.newaxis]
+        self.blink_onsets = [onset for onset in self.blink_onsets if onset + self.blink_length > end]
+
+    def close(self):
+        pass
+
+class NetworkSource:
+    """Samples streamed by a device bridge as little-endian float32 values,
+    channels per sample, in UDP datagrams or over a TCP connection.
+
+    For TCP this listens and accepts one bridge at a time; a dropped
+    connection is accepted again on a later read(). Each UDP datagram holds
+    whole samples; a partial sample at its end is dropped and counted, so
+    the next datagram still starts at the first channel.
+    """
+    def __init__(self, protocol, host, port, rate=250, channels=8):
+        self.protocol = protocol
+        self.rate = rate
+        self.channels = channels
+        self.description = f"{protocol}://{host}:{port} {rate} Hz x {channels} ch"
+        self.frame_bytes = 4 * channels
+        self.pending = bytearray()
+        self.connection = None
+        self.dropped = 0
+        self.errors = 0  # Failed receives, retried on the next read()
+        kind = socket.SOCK_DGRAM if protocol == "udp" else socket.SOCK_STREAM
+        self.socket = socket.socket(socket.AF_INET, kind)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.socket.bind((host, port))
+            if protocol == "tcp":
+                self.socket.listen(1)
+        except OSError:
+            self.socket.close()
+            raise
+        self.socket.setblocking(False)
+
+    def receive(self):
+        """Drain the socket without blocking, up to the backlog limit"""
+        limit = int(MAX_BACKLOG_SECONDS * self.rate) * self.frame_bytes
+        if self.protocol == "tcp" and self.connection is None:
+            try:
+                self.connection, _ = self.socket.accept()
+                self.connection.setblocking(False)
+            except BlockingIOError:
+                return
+        receiver = self.socket if self.protocol == "udp" else self.connection
+        while len(self.pending) < limit:
+            try:
+                data = receiver.recv(65536)
+            except BlockingIOError:
+                return
+            except OSError:
+                self.errors += 1
+                if self.protocol == "udp":
+                    return
+                data = b""  # Treated as the bridge disconnecting
+            if not data and self.protocol == "tcp":
+                # Bridge disconnected, wait for the next one
+                self.connection.close()
+                self.connection = None
+                self.dropped += len(self.pending) // self.frame_bytes
+                self.pending.clear()
+                return
+            if self.protocol == "udp" and len(data) % self.frame_bytes:
+                self.dropped += 1
+                data = data[:len(data) - len(data) % self.frame_bytes]
+            self.pending += data
+
+    def read(self):
+        self.receive()
+        usable = len(self.pending) - len(self.pending) % self.frame_bytes
+        samples = np.frombuffer(bytes(self.pending[:usable]), dtype="<f4").reshape(-1, self.channels)
+        del self.pending[:usable]
+        return samples.astype(np.float32)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.socket.close()
+
+def is_recording(spec):
+    return spec.lower().endswith((".csv", ".neeg"))
+
+def open_source(spec, rate=250, channels=8, speed=1.0):
+    """Open "synthetic", "udp://host:port", "tcp://host:port" or a .csv/.neeg recording
+    played back speed times faster than real time.
+
+    Raises ValueError for a malformed spec or recording and OSError if the
+    socket or file cannot be opened.
+    """
+    if spec == "synthetic":
+        return SyntheticSource(rate, channels)
+    if is_recording(spec):
+        return FileSource(spec, rate, speed)
+    parts = urlsplit(spec)
+    if parts.scheme not in ("udp", "tcp") or parts.port is None:
+        raise ValueError(f"unknown EEG source '{spec}', expected synthetic, udp://host:port, tcp://host:port "
+                         f"or a .csv/.neeg recording")
+    return NetworkSource(parts.scheme, parts.hostname or "0.0.0.0", parts.port, rate, channels)
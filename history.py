@@ -0,0 +1,181 @@
+"""Session and calibration history of every user, kept in SQLite.
+
+Sessions and calibrations are queued by the game and written by a background
+thread, each batch of whatever is queued in one transaction, so the game
+never waits on the disk. The same transaction keeps running totals per user
+and per user and day up to date, and the start menu reads only those and
+the latest session, all by primary key or index, so reading the history
+costs the same after years of sessions as after one.
+"""
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    started TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    device TEXT,
+    seconds REAL NOT NULL,
+    calm_seconds REAL NOT NULL,
+    blinks INTEGER NOT NULL,
+    longest_calm REAL NOT NULL,
+    tree_height REAL NOT NULL,
+    health INTEGER NOT NULL,
+    frame_index INTEGER NOT NULL,
+    log_path TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user, started);
+CREATE TABLE IF NOT EXISTS calibrations (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    created TEXT NOT NULL,
+    calm_low REAL NOT NULL,
+    calm_high REAL NOT NULL,
+    profile TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calibrations_by_user ON calibrations (user, created);
+CREATE TABLE IF NOT EXISTS user_totals (
+    user TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    calm_seconds REAL NOT NULL,
+    blinks INTEGER NOT NULL,
+    longest_calm REAL NOT NULL,
+    first_started TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_totals (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    calm_seconds REAL NOT NULL,
+    PRIMARY KEY (user, day)
+) WITHOUT ROWID;
+"""
+SESSION_FIELDS = ["user", "started", "mode", "device", "seconds", "calm_seconds", "blinks", "longest_calm",
+                  "tree_height", "health", "frame_index", "log_path"]
+WEEK_DAYS = 7
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    # Readers are not blocked by the writer thread
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+class SessionHistory:
+    """History database at path, created if missing.
+
+    record_session() and record_calibration() return at once; close() waits
+    for everything queued to be written.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = connect(path)
+        version, = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            with self.connection:
+                self.connection.executescript(SCHEMA)
+                self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_pending, name="history", daemon=True)
+        self.writer.start()
+
+    def record_session(self, session):
+        """Queue a session, a dict with a value for every SESSION_FIELDS name"""
+        self.pending.put(("session", session))
+
+    def record_calibration(self, user, profile):
+        """Queue a calibration profile as made by eeg.calibrate()"""
+        self.pending.put(("calibration", dict(profile, user=user)))
+
+    def write_pending(self):
+        """Writer thread: write whatever is queued in one transaction per batch"""
+        connection = connect(self.path)
+        done = False
+        while not done:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            with connection:
+                for kind, item in batch:
+                    if item is None:
+                        done = True
+                    elif kind == "session":
+                        write_session(connection, item)
+                    else:
+                        write_calibration(connection, item)
+        connection.close()
+
+    def progress(self, user, today=None):
+        """Recent progress of user from the running totals, None without sessions: totals over
+        all sessions, calm share this week and the week before, and the latest session"""
+        totals = self.connection.execute(
+            "SELECT sessions, seconds, calm_seconds, blinks, longest_calm, first_started "
+            "FROM user_totals WHERE user = ?", (user,)).fetchone()
+        if totals is None:
+            return None
+        sessions, seconds, calm_seconds, blinks, longest_calm, first_started = totals
+        today = today or datetime.date.today()
+        week_start = (today - datetime.timedelta(days=WEEK_DAYS - 1)).isoformat()
+        previous_start = (today - datetime.timedelta(days=2 * WEEK_DAYS - 1)).isoformat()
+        weeks = {"week": [0.0, 0.0], "previous_week": [0.0, 0.0]}
+        for day, day_seconds, day_calm in self.connection.execute(
+                "SELECT day, seconds, calm_seconds FROM daily_totals WHERE user = ? AND day >= ?",
+                (user, previous_start)):
+            week = weeks["week" if day >= week_start else "previous_week"]
+            week[0] += day_seconds
+            week[1] += day_calm
+        last = self.connection.execute(
+            "SELECT started, mode, seconds, calm_seconds, health FROM sessions "
+            "WHERE user = ? ORDER BY started DESC LIMIT 1", (user,)).fetchone()
+        return {
+            "sessions": sessions,
+            "seconds": seconds,
+            "calm_ratio": calm_seconds / seconds if seconds else 0.0,
+            "blinks": blinks,
+            "longest_calm": longest_calm,
+            "first_started": first_started,
+            "week_calm_ratio": {name: calm / total if total else None for name, (total, calm) in weeks.items()},
+            "last_session": dict(zip(["started", "mode", "seconds", "calm_seconds", "health"], last)),
+        }
+
+    def close(self):
+        self.pending.put((None, None))
+        self.writer.join()
+        self.connection.close()
+
+def write_session(connection, session):
+    connection.execute(f"INSERT INTO sessions ({', '.join(SESSION_FIELDS)}) "
+                       f"VALUES ({', '.join('?' * len(SESSION_FIELDS))})",
+                       [session[name] for name in SESSION_FIELDS])
+    user, started = session["user"], session["started"]
+    seconds, calm_seconds = session["seconds"], session["calm_seconds"]
+    connection.execute(
+        "INSERT INTO user_totals VALUES (?, 1, ?, ?, ?, ?, ?) ON CONFLICT (user) DO UPDATE SET "
+        "sessions = sessions + 1, seconds = seconds + excluded.seconds, "
+        "calm_seconds = calm_seconds + excluded.calm_seconds, blinks = blinks + excluded.blinks, "
+        "longest_calm = max(longest_calm, excluded.longest_calm), "
+        "first_started = min(first_started, excluded.first_started)",
+        (user, seconds, calm_seconds, session["blinks"], session["longest_calm"], started))
+    connection.execute(
+        "INSERT INTO daily_totals VALUES (?, ?, 1, ?, ?) ON CONFLICT (user, day) DO UPDATE SET "
+        "sessions = sessions + 1, seconds = seconds + excluded.seconds, "
+        "calm_seconds = calm_seconds + excluded.calm_seconds",
+        (user, started[:10], seconds, calm_seconds))
+
+def write_calibration(connection, profile):
+    connection.execute("INSERT INTO calibrations (user, created, calm_low, calm_high, profile) VALUES (?, ?, ?, ?, ?)",
+                       (profile["user"], profile["created"], profile["calm_low"], profile["calm_high"],
+                        json.dumps(profile)))
@@ -1,50 +1,65 @@
 import pygame
+import numpy as np
 import os
+import json
+import math
 import time
-import random
+import argparse
+import atexit
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize Pygame and mixer
-pygame.init()
-pygame.mixer.init()
+import asset_cache
+import eeg
+from profiler import FrameProfiler
+from replay import InputRecorder, InputReplay, key_mask
+from capture import FrameCapture, find_ffmpeg, is_video
+from history import SessionHistory
+from session_log import SessionLog
+from wellness import WellnessStats
 
-screen = pygame.display.set_mode((1100, 700))  # Updated window size
-pygame.display.set_caption("NeuroNest: Relax to Grow")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont(None, 28)
+startup_begin = time.perf_counter()
 
-# Load static tree images
-try:
-    tree_small = pygame.image.load("assets/tree_small.png").convert_alpha()
-    tree_medium = pygame.image.load("assets/tree_medium.png").convert_alpha()
-    tree_large = pygame.image.load("assets/tree_large.png").convert_alpha()
-except Exception as e:
-    print("Static tree images missing:", e)
-    tree_small = tree_medium = tree_large = None
-
-# Load animated frames: frames 34-98 then 1-33 for looping
+# Created by init_display() and load_sounds()
+screen = None
+clock = None
+water_sound = None
+frame_capture = None  # Set by --capture for the session
+device_connected = False  # Set from the start menu
+eeg_acquisition = None  # EEG reading thread while a device is connected
+eeg_blinks_seen = 0  # Device blink count already applied to the game
+
+# EEG source opened by [D] in the start menu, set from the command line
+eeg_source_spec = "synthetic"
+eeg_rate = 250
+eeg_channels = 8
+eeg_mains = 50  # Power line frequency notched out of the signal
+eeg_speed = 1.0  # Playback speed of a recording
+
+# Per-user calibration profiles, kept between runs
+DATA_DIR = os.environ.get("NEURONEST_DATA_DIR", "data")
+user_name = "default"
+calibration = None  # The user's stored profile, loaded at startup
+calibration_seconds = 60
+# Every user's past sessions and calibrations, and this user's progress read from it at startup
+HISTORY_BUDGET_MS = 50  # Reading the progress for the menu is expected to take less than this
+history = None
+user_progress = None
+
+# Animated frames: one trimmed atlas built by scripts/build_frame_atlas.py, or
+# frames 34-98 then 1-33 as separate files when no atlas has been built
 FRAME_FOLDER = "assets/frames"
-animated_frames = []
-for i in list(range(34, 99)) + list(range(1, 34)):
-    try:
-        path = os.path.join(FRAME_FOLDER, f"frame_{i:03}.png")
-        animated_frames.append(pygame.image.load(path).convert_alpha())
-    except Exception as e:
-        print(f"Missing frame {i}: {e}")
+FRAME_ATLAS = "assets/frames_atlas.json"
+FRAME_ORDER = list(range(34, 99)) + list(range(1, 34))
 
-# Load background music (optional) - RESTORED
 try:
-    pygame.mixer.music.load("assets/calm.mp3")
-    pygame.mixer.music.set_volume(0.3)  # Background music restored at moderate volume
-    pygame.mixer.music.play(-1)
+    with open(FRAME_ATLAS) as f:
+        frame_atlas = json.load(f)
+    frame_paths = [os.path.join(os.path.dirname(FRAME_ATLAS), frame_atlas["image"])]
 except Exception:
-    pass
-
-# Load water sound - ENHANCED FOR RECORDING
-try:
-    water_sound = pygame.mixer.Sound("assets/water.wav")
-    water_sound.set_volume(0.8)  # Louder water sounds for clear recording
-except:
-    water_sound = None
+    frame_atlas = None
+    frame_paths = [os.path.join(FRAME_FOLDER, f"frame_{i:03}.png") for i in FRAME_ORDER]
 
 # Sky color stages - Enhanced with more vibrant colors
 sky_colors = [
@@ -59,265 +74,781 @@ def get_sky_color(height):
     stage = min(int((height - 10) / 8), len(sky_colors) - 1)  # Adjusted for 10-42 range
     return sky_colors[stage]
 
+# Tree stages: (max height, image key, height start, height span, scale start, scale span, max width, max height)
+# Original image dimensions:
+# Tree Small: 1417 × 1317 pixels
+# Tree Medium: 283 × 301 pixels
+# Tree Large: 283 × 269 pixels
+TREE_STAGES = [
+    (20, "small", 10, 10, 0.12, 0.15, 1100, 750),    # 170×158 to 382×355 pixels
+    (30, "medium", 20, 10, 1.20, 0.30, 1100, 750),   # 339×361 to 424×551 pixels
+    (42, "large", 30, 12, 1.53, 0.70, 1050, 680),    # 432×411 to 631×600 pixels
+]
+
+# Pre-sized tree levels built offline by scripts/build_tree_mips.py
+TREE_MIP_FOLDER = "assets/trees"
+
+def closest_tree_level(levels, width):
+    """Return the smallest (width, source) level at least width wide, or the largest level"""
+    # Scaling up from a smaller level would blur the tree
+    wide_enough = [level for level in levels if level[0] >= width]
+    return min(wide_enough) if wide_enough else max(levels)
+
+def plan_tree_levels():
+    """Return, per stage, the source size and the (width, path) mip levels its scale range can pick"""
+    try:
+        with open(os.path.join(TREE_MIP_FOLDER, "manifest.json")) as f:
+            manifest = json.load(f)
+    except Exception:
+        manifest = {}  # No mip chain built, use the full-size PNGs
+
+    plan = {}
+    for _, key, _, _, scale_start, scale_span, max_width, _ in TREE_STAGES:
+        name = f"tree_{key}"
+        source_path = f"assets/{name}.png"
+        entry = manifest.get(name)
+        if entry is None:
+            plan[key] = (None, [(None, source_path)])  # Size known once decoded
+            continue
+
+        # The source image is level 1.0 of its own chain
+        source_size = tuple(entry["size"])
+        levels = [(source_size[0], source_path)]
+        levels += [(level["size"][0], os.path.join(TREE_MIP_FOLDER, level["file"])) for level in entry["levels"]]
+
+        # Levels between the ones picked at the smallest and largest drawn width
+        min_width = closest_tree_level(levels, min(source_size[0] * scale_start, max_width))[0]
+        max_width = closest_tree_level(levels, min(source_size[0] * (scale_start + scale_span), max_width))[0]
+        plan[key] = (source_size, [(width, path) for width, path in sorted(levels) if min_width <= width <= max_width])
+    return plan
+
+def load_tree_images(plan, images):
+    tree_images = {}
+    for key, (source_size, levels) in plan.items():
+        surfaces = [(width, images[path].convert_alpha()) for width, path in levels]
+        if source_size is None:
+            source_size = surfaces[0][1].get_size()
+            surfaces = [(source_size[0], surfaces[0][1])]
+        tree_images[key] = (source_size, surfaces)
+    return tree_images
+
+def load_animated_frames(images, errors):
+    """Return the full frame size and (surface, offset) pairs in play order"""
+    if frame_atlas is not None:
+        atlas_path = frame_paths[0]
+        if atlas_path not in images:
+            print(f"Missing frame atlas: {errors.get(atlas_path)}")
+            return (0, 0), []
+        # Frames are trimmed subsurfaces of the atlas, offset back into the full frame
+        atlas = images[atlas_path].convert_alpha()
+        frames = []
+        for i in frame_atlas["order"]:
+            entry = frame_atlas["frames"][str(i)]
+            frames.append((atlas.subsurface(entry["rect"]), tuple(entry["offset"])))
+        return tuple(frame_atlas["frame_size"]), frames
+
+    frames = []
+    for i, path in zip(FRAME_ORDER, frame_paths):
+        if path in images:
+            frames.append((images[path].convert_alpha(), (0, 0)))
+        else:
+            print(f"Missing frame {i}: {errors.get(path)}")
+    return (frames[0][0].get_size() if frames else (0, 0)), frames
+
+def build_tree_resource(images, errors):
+    try:
+        trees = load_tree_images(tree_plan, images)
+    except Exception as e:
+        print("Static tree images missing:", errors or e)
+        trees = {}
+    return trees, sum(surface_bytes(surface) for _, levels in trees.values() for _, surface in levels)
+
+def build_frame_resource(images, errors):
+    size, frames = load_animated_frames(images, errors)
+    # Atlas frames are subsurfaces, so count each parent surface once
+    parents = {}
+    for frame, _ in frames:
+        parent = frame.get_parent() or frame
+        parents[id(parent)] = parent
+    return (size, frames), sum(surface_bytes(surface) for surface in parents.values())
+
+tree_plan = plan_tree_levels()
+tree_paths = [path for _, levels in tree_plan.values() for _, path in levels]
+
+# Images are only loaded for the modes that use them
+RESOURCES = {
+    "trees": (tree_paths, build_tree_resource),
+    "frames": (frame_paths, build_frame_resource),
+}
+MODE_RESOURCES = {
+    "static": ["trees"],
+    "animated": ["frames"],
+    "health": ["frames"],
+}
+
+class ResourceManager:
+    """Loads each mode's images on first use or in the background, and evicts
+    resources of modes not in use once resident memory exceeds the budget"""
+    def __init__(self, resources, budget_bytes):
+        self.resources = resources
+        self.budget_bytes = budget_bytes
+        self.resident = {}  # name -> (value, bytes)
+        self.pending = {}   # name -> future of asset_cache.load_images()
+        self.pending_sizes = {}  # name -> bytes of a finished prefetch
+        # A single worker, so loads never race on the decoded-pixel cache manifest
+        self.loader = ThreadPoolExecutor(max_workers=1)
+
+    def prefetch(self, names):
+        """Start decoding in the background; surfaces are converted on the main thread later"""
+        for name in names:
+            if name not in self.resident and name not in self.pending:
+                self.pending[name] = self.loader.submit(asset_cache.load_images, self.resources[name][0])
+
+    def require(self, mode):
+        """Make the mode's resources resident, waiting only for the ones not loaded yet"""
+        names = MODE_RESOURCES[mode]
+        for name in names:
+            if name in self.resident:
+                continue
+            self.prefetch([name])
+            self.pending_sizes.pop(name, None)
+            images, stats = self.pending.pop(name).result()
+            value, size = self.resources[name][1](images, stats["errors"])
+            self.resident[name] = (value, size)
+            print(f"Loaded {name} in {stats['seconds'] * 1000:.0f} ms ({stats['decoded']} decoded, "
+                  f"{stats['cached']} from cache, {size // 1024} KB resident)")
+        self.evict(keep=names)
+
+    def evict(self, keep):
+        # Prefetched images nobody has used yet go first, then resident ones
+        for name in list(self.pending):
+            if self.resident_bytes() <= self.budget_bytes:
+                break
+            if name not in keep and self.pending_bytes(name):
+                size = self.pending_bytes(name)
+                del self.pending[name], self.pending_sizes[name]
+                print(f"Dropped prefetched {name} ({size // 1024} KB) to stay within the memory budget")
+        for name in list(self.resident):
+            if self.resident_bytes() <= self.budget_bytes:
+                break
+            if name not in keep:
+                size = self.resident.pop(name)[1]
+                print(f"Evicted {name} ({size // 1024} KB) to stay within the memory budget")
+
+    def pending_bytes(self, name):
+        """Memory of a prefetch's decoded images, 0 until it has finished"""
+        if name not in self.pending_sizes:
+            future = self.pending[name]
+            if not future.done():
+                return 0
+            images = future.result()[0] if future.exception() is None else {}
+            self.pending_sizes[name] = sum(surface_bytes(surface) for surface in images.values())
+        return self.pending_sizes[name]
+
+    def resident_bytes(self):
+        """Memory of resident resources and of finished prefetches waiting to be used"""
+        return (sum(size for _, size in self.resident.values())
+                + sum(self.pending_bytes(name) for name in self.pending))
+
+    def get(self, name, default):
+        return self.resident[name][0] if name in self.resident else default
+
+resources = None  # Created by init_resources()
+tree_images = {}
+frame_size, animated_frames = (0, 0), []
+frame_rect = pygame.Rect(0, 0, 0, 0)
+
+def activate_mode(mode):
+    """Load what the mode needs (a no-op once resident) and point the drawing code at it"""
+    global tree_images, frame_size, animated_frames, frame_rect
+    resources.require(mode)
+    tree_images = resources.get("trees", {})
+    if not tree_images:
+        tree_cache.clear()  # Scaled sprites go with their evicted source images
+    frame_size, animated_frames = resources.get("frames", ((0, 0), []))
+    frame_rect = pygame.Rect((0, 0), frame_size)
+    frame_rect.center = (550, 350)  # Center in window
+
+# Growth moves in 0.5 / 0.7 steps, so heights land on a 0.1 grid
+TREE_HEIGHT_STEP = 0.1
+TREE_CACHE_MAX_BYTES = 48 * 1024 * 1024  # ~30 large trees at full size
+
+def surface_bytes(surface):
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+class SurfaceCache:
+    """LRU cache of surfaces capped by total pixel memory"""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        surface = self.entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return surface
+
+    def put(self, key, surface):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= surface_bytes(old)
+        self.entries[key] = surface
+        self.bytes += surface_bytes(surface)
+        # Evict least recently used entries, but always keep the newest one
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= surface_bytes(evicted)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+tree_cache = SurfaceCache(TREE_CACHE_MAX_BYTES)
+
+# Full-window gradients: the menu one never changes, health ones depend only on health
+GRADIENT_CACHE_MAX_BYTES = 32 * 1024 * 1024  # ~10 full-window health gradients
+gradient_cache = SurfaceCache(GRADIENT_CACHE_MAX_BYTES)
+
+def make_vertical_gradient(row_colors):
+    """Build a full-window surface from one RGB color per row in a single pass"""
+    column = np.asarray(row_colors, dtype=np.uint8)
+    pixels = np.broadcast_to(column[np.newaxis, :, :], (1100, 700, 3))
+    return pygame.surfarray.make_surface(pixels).convert()
+
+menu_gradient = None
+
+def get_menu_gradient():
+    global menu_gradient
+    if menu_gradient is not None:
+        return menu_gradient
+
+    # Create a more complex gradient with multiple color zones
+    y = np.arange(700)[:, np.newaxis]
+    top = y / 200                # Top section - darker to lighter blue
+    middle = (y - 200) / 200     # Middle section - rich blue transition
+    bottom = (y - 400) / 300     # Bottom section - deeper blues
+    colors = np.select(
+        [y < 200, y < 400],
+        [
+            np.array([5, 15, 30]) + top * np.array([20, 40, 60]),
+            np.array([25, 55, 90]) + middle * np.array([15, 35, 50]),
+        ],
+        np.array([40, 90, 140]) + bottom * np.array([10, 20, 20])
+    )
+    menu_gradient = make_vertical_gradient(colors.astype(int))
+    return menu_gradient
+
+def get_health_gradient(health):
+    gradient = gradient_cache.get(("health", health))
+    if gradient is not None:
+        return gradient
+
+    # Health influences the background color
+    base_color = np.array([20, 80, 120])
+    health_influence = int(health / 100.0 * 50)
+    gradient_factor = np.arange(700)[:, np.newaxis] / 700
+    colors = (
+        base_color
+        + (gradient_factor * np.array([20, 30, 40])).astype(int)
+        + np.array([health_influence // 3, health_influence // 2, health_influence])
+    )
+    # Ensure colors don't exceed 255
+    colors = np.minimum(colors, 255)
+    return gradient_cache.put(("health", health), make_vertical_gradient(colors))
+
+# Fonts are created once per size, rendered text once per (text, size, color)
+TEXT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+fonts = {}
+text_cache = SurfaceCache(TEXT_CACHE_MAX_BYTES)
+
+def get_font(size=28):
+    font = fonts.get(size)
+    if font is None:
+        font = fonts[size] = pygame.font.SysFont(None, size)
+    return font
+
+def render_text(text, size=28, color=(255, 255, 255)):
+    """Return the rendered text surface, rasterizing each distinct string only once"""
+    key = (text, size, color)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = text_cache.put(key, get_font(size).render(text, True, color))
+    return surface
+
+def cache_stats():
+    """Return hit/miss counts and memory use of every surface cache"""
+    caches = {"tree": tree_cache, "gradient": gradient_cache, "text": text_cache}
+    return {
+        name: {"hits": cache.hits, "misses": cache.misses, "entries": len(cache.entries), "bytes": cache.bytes}
+        for name, cache in caches.items()
+    }
+
+def print_cache_stats():
+    for name, stats in cache_stats().items():
+        total = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / total if total else 0
+        print(f"{name} cache: {stats['hits']} hits, {stats['misses']} misses ({hit_rate:.1f}% hit rate), "
+              f"{stats['entries']} entries, {stats['bytes'] // 1024} KB")
+
+def get_tree_stage_index(height):
+    for i, stage in enumerate(TREE_STAGES):
+        if height <= stage[0]:
+            return i
+    return len(TREE_STAGES) - 1
+
 def get_tree_stage(height):
-    if height <= 20:
-        return "Small Tree"
-    elif height <= 30:
-        return "Medium Tree"
-    else:
-        return "Large Tree"
+    return f"{TREE_STAGES[get_tree_stage_index(height)][1].title()} Tree"
 
 def get_current_scale(height):
     """Return the current scale factor for the tree at given height"""
-    # Original image dimensions:
-    # Tree Small: 1417 × 1317 pixels
-    # Tree Medium: 283 × 301 pixels  
-    # Tree Large: 283 × 269 pixels
-    
-    if height <= 20:
-        # Tree 1: 170×158 to 382×355 pixels
-        # Scale range: 0.12 to 0.27 (based on width: 170/1417 to 382/1417)
-        progress = (height - 10) / 10
-        return 0.12 + progress * 0.15
-    elif 20 < height <= 30:
-        # Tree 2: 339×361 to 424×551 pixels
-        # Scale range: 1.20 to 1.50 (based on width: 339/283 to 424/283)
-        progress = (height - 20) / 10
-        return 1.20 + progress * 0.30
-    else:
-        # Tree 3: 432×411 to 631×600 pixels
-        # Scale range: 1.53 to 2.23 (based on width: 432/283 to 631/283)
-        progress = min((height - 30) / 12, 1.0)
-        return 1.53 + progress * 0.70
+    _, _, start, span, scale_start, scale_span, _, _ = TREE_STAGES[get_tree_stage_index(height)]
+    progress = min((height - start) / span, 1.0)
+    return scale_start + progress * scale_span
+
+def quantize_tree_height(height):
+    return round(height / TREE_HEIGHT_STEP) * TREE_HEIGHT_STEP
+
+def get_tree_sprite(height):
+    """Return the scaled tree surface for this height, scaling it only once"""
+    height = quantize_tree_height(height)
+    stage_index = get_tree_stage_index(height)
+    key = (stage_index, round(height / TREE_HEIGHT_STEP))
+    sprite = tree_cache.get(key)
+    if sprite is not None:
+        return sprite
+
+    _, image_key, _, _, _, _, max_width, max_height = TREE_STAGES[stage_index]
+    (source_width, source_height), levels = tree_images[image_key]
+    scale = get_current_scale(height)
+
+    # Calculate dimensions (scales are relative to the full-size source image)
+    width = int(source_width * scale)
+    height_scaled = int(source_height * scale)
+
+    # Safety check for window bounds
+    if width > max_width:
+        scale = max_width / source_width
+        width = max_width
+        height_scaled = int(source_height * scale)
+    if height_scaled > max_height:
+        scale = max_height / source_height
+        width = int(source_width * scale)
+        height_scaled = max_height
+
+    # Shrink the smallest pre-sized level that is wide enough instead of the full-size image
+    img = closest_tree_level(levels, width)[1]
+    return tree_cache.put(key, pygame.transform.smoothscale(img, (width, height_scaled)))
 
 def draw_instructions(lines):
-    for i, text in enumerate(lines):
-        render = font.render(text, True, (255, 255, 255))
-        screen.blit(render, (10, 10 + i * 24))
+    return [screen.blit(render_text(text), (10, 10 + i * 24)) for i, text in enumerate(lines)]
 
 def draw_tree_static(height):
-    if not tree_small or not tree_medium or not tree_large:
-        return
+    if len(tree_images) < len(TREE_STAGES):
+        return []
 
     # Single tree replacement system with test range 10-42
     # Tree 1 (small): height 10-20 (size 1-5)
     # Tree 2 (medium): height 20-30 (size 6-10) - replaces tree 1
     # Tree 3 (large): height 30-42 (size 11-15) - replaces tree 2
-    
-    if height <= 20:
-        # Show only first tree (small), 170×158 to 382×355 pixels
-        img = tree_small
-        progress = (height - 10) / 10  # 0 to 1 over height 10-20
-        scale = 0.12 + progress * 0.15  # 0.12 to 0.27 scale
-        
-        # Calculate dimensions
-        width = int(img.get_width() * scale)
-        height_scaled = int(img.get_height() * scale)
-        
-        # Safety check for window bounds
-        max_width = 1100
-        max_height = 750
-        if width > max_width:
-            scale = max_width / img.get_width()
-            width = max_width
-            height_scaled = int(img.get_height() * scale)
-        if height_scaled > max_height:
-            scale = max_height / img.get_height()
-            width = int(img.get_width() * scale)
-            height_scaled = max_height
-            
-        img_scaled = pygame.transform.smoothscale(img, (width, height_scaled))
-        x = (1100 - width) // 2  # Center in window
-        y = 700 - height_scaled
-        screen.blit(img_scaled, (x, y))
-        
-    elif 20 < height <= 30:
-        # Show only second tree (medium), 339×361 to 424×551 pixels
-        img = tree_medium
-        progress = (height - 20) / 10  # 0 to 1 over height 20-30
-        scale = 1.20 + progress * 0.30  # 1.20 to 1.50 scale
-        
-        # Calculate dimensions
-        width = int(img.get_width() * scale)
-        height_scaled = int(img.get_height() * scale)
-        
-        # Safety check for window bounds
-        max_width = 1100
-        max_height = 750
-        if width > max_width:
-            scale = max_width / img.get_width()
-            width = max_width
-            height_scaled = int(img.get_height() * scale)
-        if height_scaled > max_height:
-            scale = max_height / img.get_height()
-            width = int(img.get_width() * scale)
-            height_scaled = max_height
-            
-        img_scaled = pygame.transform.smoothscale(img, (width, height_scaled))
-        x = (1100 - width) // 2  # Center in window
-        y = 700 - height_scaled
-        screen.blit(img_scaled, (x, y))
-        
-    else:  # height > 30
-        # Show only third tree (large), 432×411 to 631×600 pixels
-        img = tree_large
-        progress = min((height - 30) / 12, 1.0)  # 0 to 1, height 30-42
-        scale = 1.53 + progress * 0.70  # 1.53 to 2.23 scale
-        
-        # Calculate dimensions
-        width = int(img.get_width() * scale)
-        height_scaled = int(img.get_height() * scale)
-        
-        # Safety check for window bounds
-        max_width = 1050
-        max_height = 680
-        if width > max_width:
-            scale = max_width / img.get_width()
-            width = max_width
-            height_scaled = int(img.get_height() * scale)
-        if height_scaled > max_height:
-            scale = max_height / img.get_height()
-            width = int(img.get_width() * scale)
-            height_scaled = max_height
-            
-        img_scaled = pygame.transform.smoothscale(img, (width, height_scaled))
-        x = (1100 - width) // 2  # Center in window
-        y = 700 - height_scaled
-        screen.blit(img_scaled, (x, y))
+    img_scaled = get_tree_sprite(height)
+    x = (1100 - img_scaled.get_width()) // 2  # Center in window
+    y = 700 - img_scaled.get_height()
+    return [screen.blit(img_scaled, (x, y))]
+
 
+# White circular fade behind the animated image, baked once at startup
+FADE_RADIUS = 200      # Maximum radius of the white circle
+FADE_INTENSITY = 0.3   # Controls fade intensity
+FADE_STEP = 10         # Radius step between the stacked circles
+
+def make_radial_fade(max_radius=FADE_RADIUS, intensity=FADE_INTENSITY, step=FADE_STEP):
+    """Bake the stacked white fade circles into one SRCALPHA surface"""
+    # Circle alphas grow towards the center (closer = more white)
+    radii = np.arange(max_radius, 0, -step)[::-1]
+    alphas = (255 * (max_radius - radii) / max_radius * intensity).astype(int)
+
+    # A pixel at distance d is covered by every circle with radius >= d, and
+    # stacking them lets through the product of their (1 - alpha) factors
+    transmittance = np.append(np.cumprod((1 - alphas / 255)[::-1])[::-1], 1.0)
+    coords = np.arange(2 * max_radius) - max_radius + 0.5
+    distance = np.hypot(coords[:, np.newaxis], coords[np.newaxis, :])
+    covered_from = np.searchsorted(radii, distance, side="left")
+
+    fade = pygame.Surface((2 * max_radius, 2 * max_radius), pygame.SRCALPHA)
+    fade.fill((255, 255, 255, 0))
+    alpha = pygame.surfarray.pixels_alpha(fade)
+    alpha[:] = np.round(255 * (1 - transmittance[covered_from])).astype(np.uint8)
+    del alpha  # Unlock the surface
+    return fade
+
+radial_fade = make_radial_fade()
 
 def draw_animated_frame(frame_index):
     if not animated_frames:
-        return
-    frame = animated_frames[frame_index]
-    rect = frame.get_rect(center=(550, 350))  # Center in window
-    screen.blit(frame, rect)
+        return []
+    # Add white circular fade area around the animated image
+    rects = [screen.blit(radial_fade, radial_fade.get_rect(center=(550, 350)))]
+    profiler.lap("radial fade")
+    frame, (x_offset, y_offset) = animated_frames[frame_index]
+    rects.append(screen.blit(frame, (frame_rect.x + x_offset, frame_rect.y + y_offset)))
+    profiler.lap("sprite")
+    return rects
+
+# Particles live in fixed-capacity NumPy pools, updated in bulk and drawn from pre-rendered sprites
+rng = np.random.default_rng()
+MAX_PARTICLE_RECTS = 32
+
+class ParticlePool(ABC):
+    """Fixed-capacity particle arrays; new particles recycle the oldest slots.
+    Positions before the last simulation step are kept for interpolated drawing.
+    Subclasses fill sprites and say which sprite each particle uses."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.previous_x = np.zeros(capacity, dtype=np.float32)
+        self.previous_y = np.zeros(capacity, dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.int16)
+        self.color = np.zeros(capacity, dtype=np.int16)
+        self.alpha = np.zeros(capacity, dtype=np.int16)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.cursor = 0
+        self.sprites = []
+
+    def allocate(self, count):
+        """Return slot indices for count new particles, overwriting the oldest ones"""
+        count = min(count, self.capacity)
+        slots = (self.cursor + np.arange(count)) % self.capacity
+        self.cursor = (self.cursor + count) % self.capacity
+        self.active[slots] = True
+        return slots
+
+    def clear(self):
+        self.active[:] = False
+
+    def save_positions(self, slots=slice(None)):
+        """Remember positions as the start of the next interpolation"""
+        self.previous_x[slots] = self.x[slots]
+        self.previous_y[slots] = self.y[slots]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    @abstractmethod
+    def sprite_ids(self, slots):
+        """Index into sprites of each particle in slots"""
+
+    @abstractmethod
+    def offsets(self, slots):
+        """x and y distances from each particle's position to its sprite's top left"""
+
+    def draw(self, alpha=1.0):
+        """Blit every active particle at alpha of the way through the last
+        simulation step, returning the damaged screen rectangles"""
+        slots = np.flatnonzero(self.active)
+        if not len(slots):
+            return []
+        sprite_ids = self.sprite_ids(slots).tolist()
+        x_offset, y_offset = self.offsets(slots)
+        x, y = self.x[slots], self.y[slots]
+        if alpha < 1:
+            x = self.previous_x[slots] + (x - self.previous_x[slots]) * alpha
+            y = self.previous_y[slots] + (y - self.previous_y[slots]) * alpha
+        positions = zip((x - x_offset).astype(int).tolist(), (y - y_offset).astype(int).tolist())
+        rects = screen.blits(zip(map(self.sprites.__getitem__, sprite_ids), positions))
+        # Large clouds of particles are reported as one bounding rectangle
+        if len(rects) > MAX_PARTICLE_RECTS:
+            return [rects[0].unionall(rects[1:])]
+        return rects
 
 # Leaves animation
-class Leaf:
-    def __init__(self):
-        self.x = random.randint(0, 1100)  # Window width
-        self.y = random.randint(-100, -20)
-        self.size = random.randint(10, 20)
-        self.speed = random.uniform(0.3, 1)
+LEAF_COLORS = [
+    (34, 139, 34),   # Forest green
+    (50, 205, 50),   # Lime green
+    (144, 238, 144), # Light green
+    (107, 142, 35),  # Olive drab
+    (85, 107, 47)    # Dark olive green
+]
+LEAF_SIZES = range(10, 21)
+
+def make_leaf_sprite(size, color):
+    # Leaf shape, shifted so its leftmost point sits at x = 0
+    left = size // 3
+    leaf_points = [
+        (left, 0),
+        (left + size, size // 3),
+        (left + size // 2, size),
+        (0, size // 2)
+    ]
+    sprite = pygame.Surface((left + size + 1, size + 1), pygame.SRCALPHA)
+    pygame.draw.polygon(sprite, color, leaf_points)
+    # Add a subtle highlight
+    pygame.draw.polygon(sprite, (min(255, color[0] + 30), min(255, color[1] + 30), min(255, color[2] + 30)), leaf_points, 1)
+    return sprite
+
+class LeafPool(ParticlePool):
+    def __init__(self, count):
+        super().__init__(count)
+        self.sprites = [make_leaf_sprite(size, color) for size in LEAF_SIZES for color in LEAF_COLORS]
+        self.respawn(self.allocate(count))
+
+    def respawn(self, slots):
+        self.x[slots] = rng.integers(0, 1100, len(slots), endpoint=True)  # Window width
+        self.y[slots] = rng.integers(-100, -20, len(slots), endpoint=True)
+        self.size[slots] = rng.integers(LEAF_SIZES.start, LEAF_SIZES.stop, len(slots))
+        self.speed[slots] = rng.uniform(0.3, 1, len(slots))
+        self.color[slots] = rng.integers(0, len(LEAF_COLORS), len(slots))
+        self.save_positions(slots)
 
     def update(self):
+        self.save_positions()
         self.y += self.speed
-        self.x += random.uniform(-0.2, 0.2)
-        if self.y > 720:  # Window height
-            self.y = random.randint(-100, -20)
-            self.x = random.randint(0, 1100)
-
-    def draw(self):
-        # Enhanced leaf rendering with better colors and shape variation
-        leaf_colors = [
-            (34, 139, 34),   # Forest green
-            (50, 205, 50),   # Lime green
-            (144, 238, 144), # Light green
-            (107, 142, 35),  # Olive drab
-            (85, 107, 47)    # Dark olive green
-        ]
-        color = leaf_colors[hash(str(self.x + self.y)) % len(leaf_colors)]
-        
-        # Draw leaf with slight rotation effect
-        leaf_points = [
-            (self.x, self.y),
-            (self.x + self.size, self.y + self.size // 3),
-            (self.x + self.size // 2, self.y + self.size),
-            (self.x - self.size // 3, self.y + self.size // 2)
-        ]
-        pygame.draw.polygon(screen, color, leaf_points)
-        # Add a subtle highlight
-        pygame.draw.polygon(screen, (min(255, color[0] + 30), min(255, color[1] + 30), min(255, color[2] + 30)), leaf_points, 1)
+        self.x += rng.uniform(-0.2, 0.2, self.capacity).astype(np.float32)
+        fallen = np.flatnonzero(self.y > 720)  # Window height
+        if len(fallen):
+            self.respawn(fallen)
+
+    def sprite_ids(self, slots):
+        return (self.size[slots] - LEAF_SIZES.start) * len(LEAF_COLORS) + self.color[slots]
+
+    def offsets(self, slots):
+        return self.size[slots] // 3, 0
 
 # Water drops animation
-class WaterDrop:
-    def __init__(self, x, y):
-        self.x = x + random.randint(-15, 15)  # Wider spread
-        self.y = y
-        self.size = random.randint(8, 15)  # Larger drops
-        self.speed = random.uniform(1.5, 3.5)  # Slightly slower for better visibility
-        self.alpha = 255
-        self.surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
-        self.color_variant = random.choice([
-            (0, 150, 255),    # Bright blue
-            (50, 200, 255),   # Light blue
-            (100, 220, 255),  # Sky blue
-            (0, 180, 255)     # Deep blue
-        ])
+WATER_DROP_COLORS = [
+    (0, 150, 255),    # Bright blue
+    (50, 200, 255),   # Light blue
+    (100, 220, 255),  # Sky blue
+    (0, 180, 255)     # Deep blue
+]
+WATER_DROP_SIZES = range(8, 16)  # Larger drops
+WATER_DROP_ALPHA_LEVELS = 16
+WATER_DROP_FADE = 6  # Slower fade for longer visibility
+MAX_WATER_DROPS = 4096
+WATER_DROP_XS = np.array([530, 550, 570])  # Multiple drops for better visual effect
+
+def make_water_drop_sprite(size, color, alpha):
+    # Create drop with glow effect
+    sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+
+    # Draw outer glow
+    if alpha > 50:
+        glow_size = size + 3
+        pygame.draw.circle(sprite, (*color, max(0, alpha // 4)), (size, size), glow_size)
+
+    # Draw main drop
+    pygame.draw.circle(sprite, (*color, alpha), (size, size), size)
+
+    # Draw highlight for 3D effect
+    if alpha > 100:
+        highlight_size = max(2, size // 3)
+        pygame.draw.circle(sprite, (255, 255, 255, min(255, alpha)),
+                           (size - size // 3, size - size // 3), highlight_size)
+    return sprite
+
+class WaterDropPool(ParticlePool):
+    def __init__(self, capacity):
+        super().__init__(capacity)
+        level_alphas = [round(level * 255 / (WATER_DROP_ALPHA_LEVELS - 1)) for level in range(WATER_DROP_ALPHA_LEVELS)]
+        self.sprites = [
+            make_water_drop_sprite(size, color, alpha)
+            for size in WATER_DROP_SIZES for color in WATER_DROP_COLORS for alpha in level_alphas
+        ]
+
+    def spawn(self, xs, y):
+        slots = self.allocate(len(xs))
+        self.x[slots] = np.asarray(xs) + rng.integers(-15, 15, len(slots), endpoint=True)  # Wider spread
+        self.y[slots] = y
+        self.size[slots] = rng.integers(WATER_DROP_SIZES.start, WATER_DROP_SIZES.stop, len(slots))
+        self.speed[slots] = rng.uniform(1.5, 3.5, len(slots))  # Slightly slower for better visibility
+        self.alpha[slots] = 255
+        self.color[slots] = rng.integers(0, len(WATER_DROP_COLORS), len(slots))
+        self.save_positions(slots)
 
     def update(self):
-        self.y += self.speed
-        self.alpha -= 6  # Slower fade for longer visibility
-        if self.alpha < 0:
-            self.alpha = 0
-        
-        # Create drop with glow effect
-        self.surface.fill((0, 0, 0, 0))  # Clear surface
-        
-        # Draw outer glow
-        if self.alpha > 50:
-            glow_size = self.size + 3
-            pygame.draw.circle(self.surface, (*self.color_variant, max(0, self.alpha // 4)), 
-                             (self.size, self.size), glow_size)
-        
-        # Draw main drop
-        pygame.draw.circle(self.surface, (*self.color_variant, self.alpha), 
-                         (self.size, self.size), self.size)
-        
-        # Draw highlight for 3D effect
-        if self.alpha > 100:
-            highlight_size = max(2, self.size // 3)
-            pygame.draw.circle(self.surface, (255, 255, 255, min(255, self.alpha)), 
-                             (self.size - self.size//3, self.size - self.size//3), highlight_size)
+        self.save_positions()
+        active = self.active
+        self.y[active] += self.speed[active]
+        self.alpha[active] = np.maximum(self.alpha[active] - WATER_DROP_FADE, 0)
+        # Faded drops free their slot
+        self.active &= self.alpha > 0
+
+    def sprite_ids(self, slots):
+        level = self.alpha[slots] * (WATER_DROP_ALPHA_LEVELS - 1) // 255
+        size_index = self.size[slots] - WATER_DROP_SIZES.start
+        return (size_index * len(WATER_DROP_COLORS) + self.color[slots]) * WATER_DROP_ALPHA_LEVELS + level
 
-    def draw(self):
-        screen.blit(self.surface, (self.x - self.size, self.y - self.size))
+    def offsets(self, slots):
+        return self.size[slots], self.size[slots]
 
-leaves = [Leaf() for _ in range(20)]
-water_drops = []
+leaves = LeafPool(20)
+water_drops = WaterDropPool(MAX_WATER_DROPS)
 
 # Key press tracking for visual indicators
 key_press_indicators = {}
 KEY_DISPLAY_TIME = 1.5  # How long to show key press indicators
 
+# Key display mapping
+KEY_DISPLAY = {
+    pygame.K_c: "[C] CALM",
+    pygame.K_b: "[B] BLINK",
+    pygame.K_r: "[R] RESET",
+    pygame.K_1: "[1] MODE",
+    pygame.K_2: "[2] MODE",
+    pygame.K_3: "[3] MODE",
+    pygame.K_ESCAPE: "[ESC] QUIT"
+}
+indicator_surface = pygame.Surface((300, 60), pygame.SRCALPHA)
+
+def connect_eeg():
+    """Open the configured EEG source and start reading it, returning an error message if that fails"""
+    global eeg_acquisition, eeg_blinks_seen
+    eeg_blinks_seen = 0
+    try:
+        eeg_acquisition = eeg.AcquisitionThread(eeg.open_source(eeg_source_spec, eeg_rate, eeg_channels, eeg_speed),
+                                                mains_hz=eeg_mains, calm_range=get_calm_range())
+    except (OSError, ValueError) as e:
+        return str(e)
+    return None
+
+def disconnect_eeg():
+    global eeg_acquisition
+    if eeg_acquisition:
+        metrics = eeg_acquisition.metrics()
+        print(f"EEG: {metrics['samples']} samples, {metrics['blinks']} blinks, {metrics['dropped']} dropped, "
+              f"queue depth peaked at {metrics['max_queue_depth']}")
+        if metrics["error"]:
+            print(f"EEG stopped with {metrics['error']}")
+        eeg_acquisition.close()
+        eeg_acquisition = None
+
+def drain_eeg_samples():
+    """Raw samples that arrived since the last call, or None without a device"""
+    return eeg_acquisition.queue.pop_all() if eeg_acquisition else None
+
+def get_profile_path():
+    return os.path.join(DATA_DIR, "profiles", f"{user_name}.json")
+
+def get_session_log_path():
+    return os.path.join(DATA_DIR, "sessions", f"{user_name}-{time.strftime('%Y%m%d-%H%M%S')}.nnsl")
+
+def load_history():
+    """Open the history and read the user's progress, within HISTORY_BUDGET_MS"""
+    global history, user_progress
+    begin = time.perf_counter()
+    history = SessionHistory(os.path.join(DATA_DIR, "history.sqlite"))
+    atexit.register(history.close)  # Also writes what is queued when the menu exits
+    user_progress = history.progress(user_name)
+    elapsed_ms = (time.perf_counter() - begin) * 1000
+    if elapsed_ms > HISTORY_BUDGET_MS:
+        print(f"Warning: reading the session history took {elapsed_ms:.0f} ms, over the {HISTORY_BUDGET_MS} ms budget")
+
+def get_progress_text():
+    """One line of the user's progress for the start menu"""
+    if not user_progress:
+        return f"{user_name}: no sessions yet"
+    text = (f"{user_name}: {user_progress['sessions']} sessions, {user_progress['seconds'] / 3600:.1f} h, "
+            f"calm {user_progress['calm_ratio']:.0%}")
+    week, previous_week = user_progress["week_calm_ratio"].values()
+    if week is not None:
+        text += f" | this week {week:.0%}"
+        if previous_week is not None:
+            text += f" (week before {previous_week:.0%})"
+    return text
+
+def record_history(mode, started, session_log):
+    if not wellness.session_steps:
+        return
+    history.record_session({
+        "user": user_name,
+        "started": started,
+        "mode": mode,
+        "device": eeg_acquisition.source.description if eeg_acquisition else None,
+        "seconds": wellness.session_steps * SIM_DT,
+        "calm_seconds": wellness.session_calm_steps * SIM_DT,
+        "blinks": wellness.session_blinks,
+        "longest_calm": wellness.session_longest_streak * SIM_DT,
+        "tree_height": tree_height,
+        "health": health,
+        "frame_index": frame_index,
+        "log_path": session_log.path if session_log else None,
+    })
+
+def get_calm_range():
+    """Relaxation ratios the calm score spans for this user, or None for the defaults"""
+    return (calibration["calm_low"], calibration["calm_high"]) if calibration else None
+
+def run_calibration():
+    """Record a resting baseline from the connected device and store it as the user's profile.
+    Returns a message for the start menu."""
+    global calibration
+    rate = eeg_acquisition.source.rate
+    drain_eeg_samples()
+    chunks = []
+    begin = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - begin
+        if elapsed >= calibration_seconds:
+            break
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                drain_eeg_samples()
+                return "Calibration cancelled"
+        if eeg_acquisition.failed:
+            return "Calibration stopped: the device failed"
+        chunks.append(drain_eeg_samples())
+        received = sum(len(chunk) for chunk in chunks)
+
+        screen.blit(get_menu_gradient(), (0, 0))
+        lines = [
+            (render_text("Calibrating", 64, (100, 255, 100)), 150),
+            (render_text("Sit comfortably, relax and keep your eyes open", 32, (220, 220, 220)), 260),
+            (render_text("Blink normally and try not to move", 28, (180, 180, 180)), 300),
+            (render_text(f"{calibration_seconds - int(elapsed)} s left", 32, (255, 255, 50)), 400),
+            (render_text(f"{received} samples from {eeg_acquisition.source.description}", 20, (150, 150, 150)), 480),
+            (render_text("[ESC] Cancel", 28, (220, 220, 220)), 560),
+        ]
+        for text, y in lines:
+            screen.blit(text, text.get_rect(center=(550, y)))
+        bar = pygame.Rect(300, 430, 500, 16)
+        pygame.draw.rect(screen, (30, 50, 80), bar)
+        pygame.draw.rect(screen, (100, 255, 100), (bar.x, bar.y, int(bar.width * elapsed / calibration_seconds), bar.height))
+        pygame.draw.rect(screen, (120, 180, 240), bar, 2)
+        pygame.display.flip()
+        clock.tick(30)
+
+    chunks.append(drain_eeg_samples())
+    try:
+        profile = eeg.calibrate(np.concatenate(chunks), rate, eeg_mains)
+    except ValueError as e:
+        return f"Calibration failed: {e}"
+    profile.update(user=user_name, source=eeg_acquisition.source.description)
+    eeg.save_profile(get_profile_path(), profile)
+    history.record_calibration(user_name, profile)
+    calibration = profile
+    eeg_acquisition.pipeline.calm.set_range(*get_calm_range())
+    return f"Calibrated: calm range {profile['calm_low']:.2f}-{profile['calm_high']:.2f}"
+
 def show_start_menu():
     selecting = True
-    device_connected = False  # Simulate device connection status
+    device_connected = eeg_acquisition is not None
+    device_error = None
+    menu_message = None  # Outcome of the last calibration
     
     while selecting:
-        # Enhanced gradient background with more depth
-        screen.fill((5, 15, 30))
-        
-        # Draw multi-layer gradient effect for more depth
-        for y in range(700):
-            color_factor = y / 700
-            # Create a more complex gradient with multiple color zones
-            if y < 200:
-                # Top section - darker to lighter blue
-                factor = y / 200
-                color = (
-                    int(5 + factor * 20),
-                    int(15 + factor * 40),
-                    int(30 + factor * 60)
-                )
-            elif y < 400:
-                # Middle section - rich blue transition
-                factor = (y - 200) / 200
-                color = (
-                    int(25 + factor * 15),
-                    int(55 + factor * 35),
-                    int(90 + factor * 50)
-                )
-            else:
-                # Bottom section - deeper blues
-                factor = (y - 400) / 300
-                color = (
-                    int(40 + factor * 10),
-                    int(90 + factor * 20),
-                    int(140 + factor * 20)
-                )
-            pygame.draw.line(screen, color, (0, y), (1100, y))
+        # Enhanced gradient background with more depth (built once)
+        screen.blit(get_menu_gradient(), (0, 0))
         
         # Add subtle animated background elements
         time_offset = time.time() * 0.5
@@ -332,17 +863,14 @@ def show_start_menu():
             screen.blit(circle_surface, (x - radius, y - radius))
         
         # Title section with larger, styled text
-        title_font = pygame.font.SysFont(None, 64)
-        subtitle_font = pygame.font.SysFont(None, 32)
-        
         # Main title with shadow effect - Enhanced colors
-        shadow_text = title_font.render("* NeuroNest *", True, (0, 0, 0))
-        main_text = title_font.render("* NeuroNest *", True, (100, 255, 100))
+        shadow_text = render_text("* NeuroNest *", 64, (0, 0, 0))
+        main_text = render_text("* NeuroNest *", 64, (100, 255, 100))
         screen.blit(shadow_text, (552, 82))
         screen.blit(main_text, (550, 80))
         
         # Subtitle - Better color
-        subtitle = subtitle_font.render("Brain-Controlled Relaxation Experience", True, (150, 255, 150))
+        subtitle = render_text("Brain-Controlled Relaxation Experience", 32, (150, 255, 150))
         subtitle_rect = subtitle.get_rect(center=(550, 130))
         screen.blit(subtitle, subtitle_rect)
         
@@ -383,29 +911,37 @@ def show_start_menu():
         pygame.draw.rect(screen, (120, 180, 240), panel_rect, 2)
         
         # Device status with icon - Improved colors
-        if device_connected:
+        if device_connected and eeg_acquisition.failed:
+            status_icon = "[ERR]"
+            status_text = "EEG Device: Stopped"
+            status_color = (255, 170, 60)
+            detail_text = eeg_acquisition.state.error
+        elif device_connected:
             status_icon = "[ON]"
             status_text = "EEG Device: Connected"
             status_color = (50, 255, 50)   # Brighter green
-            detail_text = "Ready for brain-computer interface"
+            detail_text = menu_message or f"Streaming {eeg_acquisition.source.description}"
         else:
             status_icon = "[OFF]"
             status_text = "EEG Device: Not Connected"
             status_color = (255, 100, 100)  # Softer red
-            detail_text = "Using keyboard simulation mode"
+            detail_text = f"Connection failed: {device_error}" if device_error else "Using keyboard simulation mode"
         
         status_full = f"{status_icon} {status_text}"
-        status_render = subtitle_font.render(status_full, True, status_color)
+        status_render = render_text(status_full, 32, status_color)
         status_rect = status_render.get_rect(center=(550, status_y + 15))
         screen.blit(status_render, status_rect)
         
-        detail_render = font.render(detail_text, True, (200, 200, 200))
+        detail_render = render_text(detail_text, 28, (200, 200, 200))
         detail_rect = detail_render.get_rect(center=(550, status_y + 40))
         screen.blit(detail_render, detail_rect)
+
+        progress_render = render_text(get_progress_text(), 24, (150, 220, 255))
+        screen.blit(progress_render, progress_render.get_rect(center=(550, status_y + 95)))
         
         # Mode selection section
         mode_y = 320
-        mode_title = subtitle_font.render("Select Experience Mode:", True, (220, 220, 220))
+        mode_title = render_text("Select Experience Mode:", 32, (220, 220, 220))
         mode_rect = mode_title.get_rect(center=(550, mode_y))
         screen.blit(mode_title, mode_rect)
         
@@ -427,15 +963,15 @@ def show_start_menu():
             # Key indicator - Better colors
             key_circle = pygame.Rect(220, y_pos - 15, 40, 40)
             pygame.draw.circle(screen, (60, 120, 200), key_circle.center, 20)
-            key_text = subtitle_font.render(key, True, (255, 255, 255))
+            key_text = render_text(key, 32)
             key_rect = key_text.get_rect(center=key_circle.center)
             screen.blit(key_text, key_rect)
             
             # Mode title and description
-            title_render = font.render(title, True, (255, 255, 255))
+            title_render = render_text(title)
             screen.blit(title_render, (280, y_pos - 10))
             
-            desc_render = pygame.font.SysFont(None, 20).render(desc, True, (180, 180, 180))
+            desc_render = render_text(desc, 20, (180, 180, 180))
             screen.blit(desc_render, (280, y_pos + 10))
         
         # Control panel - Enhanced colors
@@ -444,28 +980,32 @@ def show_start_menu():
         pygame.draw.rect(screen, (15, 25, 45, 220), control_panel)
         pygame.draw.rect(screen, (100, 140, 200), control_panel, 2)
         
-        controls = [
-            f"[D] {'Disconnect' if device_connected else 'Connect'} EEG Device (Demo)",
-            "[ESC] Exit Application"
-        ]
+        controls = [f"[D] {'Disconnect' if device_connected else 'Connect'} EEG Device"]
+        if device_connected:
+            if calibration:
+                controls.append(f"[C] Recalibrate {user_name} (last {calibration['created'][:10]})")
+            else:
+                controls.append(f"[C] Calibrate {user_name} ({calibration_seconds} s resting baseline)")
+        controls.append("[ESC] Exit Application")
         
         for i, control in enumerate(controls):
-            if "[D]" in control:
+            if "[D]" in control or "[C]" in control:
                 color = (255, 255, 50)  # Brighter yellow for device control
             else:
                 color = (220, 220, 220)  # Brighter white for other controls
             
-            control_render = font.render(control, True, color)
+            control_render = render_text(control, 28, color)
             control_rect = control_render.get_rect(center=(550, control_y + i * 25))
             screen.blit(control_render, control_rect)
         
         # Footer
         footer_text = "Developed for Brain-Computer Interface Research | Part 1: Software Prototype"
-        footer_render = pygame.font.SysFont(None, 18).render(footer_text, True, (120, 120, 120))
+        footer_render = render_text(footer_text, 18, (120, 120, 120))
         footer_rect = footer_render.get_rect(center=(550, 680))
         screen.blit(footer_render, footer_rect)
         
         pygame.display.flip()
+        drain_eeg_samples()  # Nothing records samples before the session starts
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -478,20 +1018,45 @@ def show_start_menu():
                     return "animated", device_connected
                 elif event.key == pygame.K_3:
                     return "health", device_connected
+                elif event.key == pygame.K_c and device_connected:
+                    menu_message = run_calibration()
                 elif event.key == pygame.K_d:
-                    device_connected = not device_connected  # Toggle demo connection
+                    menu_message = None
+                    if device_connected:
+                        disconnect_eeg()
+                        device_connected = False
+                    else:
+                        device_error = connect_eeg()
+                        device_connected = device_error is None
                 elif event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     exit()
     
     return "static", False  # Default return
 
+# The simulation advances in fixed steps whatever the frame rate; rendering
+# interpolates between the state before and after the last step
+SIM_RATE = 30  # Steps per second, the frame rate the growth speeds were tuned at
+SIM_DT = 1 / SIM_RATE
+MAX_FRAME_TIME = 0.25  # Longer stalls are not caught up, the session pauses instead
+sim_time = 0.0
+
+# Calm drives growth in proportion: 1.0 while [C] is held, or the EEG calm level (0-1)
+calm_level = 0.0
+CALM_INDICATOR_LEVEL = 0.5  # Calm shown as a [C] press from this level
+blink_window = eeg.BlinkWindow(seconds=3, limit=4)  # More blinks than this within 3 seconds means stress
+wellness = WellnessStats(SIM_DT, window_seconds=60, calm_threshold=CALM_INDICATOR_LEVEL)
+
 def reset_game_state():
-    global blink_times, tree_height, health, frame_index, water_drops, message_show_time, key_press_indicators
-    blink_times = []
+    global tree_height, health, frame_index, water_drops, message_show_time, key_press_indicators
+    global previous_tree_height, previous_health, calm_progress
+    blink_window.clear()
+    wellness.reset()
     tree_height = 10  # Start at minimum height for testing (10-42 range)
     health = 50
     frame_index = 0
+    calm_progress = 0.0  # Fractional frame/health growth carried between steps
+    previous_tree_height, previous_health = tree_height, health
     water_drops.clear()
     message_show_time = 0
     key_press_indicators.clear()
@@ -510,7 +1075,7 @@ def draw_key_indicators():
         del key_press_indicators[key]
     
     # Draw active key indicators
-    indicator_font = pygame.font.SysFont(None, 48)
+    rects = []
     y_offset = 200
     
     for key, press_time in key_press_indicators.items():
@@ -519,50 +1084,78 @@ def draw_key_indicators():
         fade_factor = 1.0 - (time_since_press / KEY_DISPLAY_TIME)
         alpha = int(255 * fade_factor)
         
-        if alpha > 0:
-            # Key display mapping
-            key_display = {
-                pygame.K_c: "[C] CALM",
-                pygame.K_b: "[B] BLINK", 
-                pygame.K_r: "[R] RESET",
-                pygame.K_1: "[1] MODE",
-                pygame.K_2: "[2] MODE",
-                pygame.K_3: "[3] MODE",
-                pygame.K_ESCAPE: "[ESC] QUIT"
-            }
+        if alpha > 0 and key in KEY_DISPLAY:
+            # Reuse one surface with alpha for the fading effect
+            indicator_surface.fill((0, 0, 0, 0))
             
-            if key in key_display:
-                # Create surface with alpha for fading effect
-                text_surface = pygame.Surface((300, 60), pygame.SRCALPHA)
-                
-                # Background box with fade
-                box_alpha = int(100 * fade_factor)
-                pygame.draw.rect(text_surface, (50, 50, 50, box_alpha), (0, 0, 300, 60))
-                pygame.draw.rect(text_surface, (255, 255, 255, alpha), (0, 0, 300, 60), 3)
-                
-                # Text with fade
-                key_text = indicator_font.render(key_display[key], True, (255, 255, 0))
-                text_surface.blit(key_text, (10, 15))
-                
-                # Position on right side of screen
-                screen.blit(text_surface, (800, y_offset))
-                y_offset += 70
+            # Background box with fade
+            box_alpha = int(100 * fade_factor)
+            pygame.draw.rect(indicator_surface, (50, 50, 50, box_alpha), (0, 0, 300, 60))
+            pygame.draw.rect(indicator_surface, (255, 255, 255, alpha), (0, 0, 300, 60), 3)
+            
+            # Text is rendered once per label
+            indicator_surface.blit(render_text(KEY_DISPLAY[key], 48, (255, 255, 0)), (10, 15))
+            
+            # Position on right side of screen
+            rects.append(screen.blit(indicator_surface, (800, y_offset)))
+            y_offset += 70
+    return rects
 
 def record_key_press(key):
     """Record a key press for visual indication"""
     key_press_indicators[key] = time.time()
 
-mode, device_connected = show_start_menu()
-reset_game_state()
+# Scene rendering: each mode draws onto a cached background layer, and every draw
+# step returns the screen rectangles it touched so only those need updating
+def get_device_label():
+    if not device_connected:
+        return "Keyboard Mode"
+    return eeg_acquisition.source.description if eeg_acquisition else "Connected"
 
-running = True
-message_show_time = 0
+def get_instructions(mode):
+    if mode == "static":
+        return [
+            "[C] Calm -> Grow tree slowly +",
+            "[B] Blink -> Water tree ~",
+            "Too many [B] -> Stress -> Shrink !",
+            "Tree evolves: Small->Medium->Large",
+            f"Current stage: {get_tree_stage(tree_height)}",
+            f"Device: {get_device_label()}",
+            "[R] Reset",
+            "[1,2,3] Change Mode",
+            "[ESC] Quit"
+        ]
+    elif mode == "animated":
+        return [
+            "[C] Calm -> Tree grows +",
+            "[B] Blink -> Tree grows/shrinks *",
+            f"Device: {get_device_label()}",
+            "[R] Reset",
+            "[1,2,3] Change Mode",
+            "[ESC] Quit"
+        ]
+    return [
+        "[C] Calm -> Health + +",
+        "[B] Blink -> Health grows/shrinks *",
+        f"Device: {get_device_label()}",
+        "[R] Reset",
+        "[1,2,3] Change Mode",
+        "[ESC] Quit"
+    ]
 
-while running:
+def get_background_key(mode):
+    """Everything the background layer of a mode depends on"""
+    if mode == "static":
+        return mode, get_sky_color(tree_height)
+    elif mode == "health":
+        return mode, health
+    return mode,
+
+def draw_background(surface, mode):
     if mode == "static":
         # Enhanced dynamic sky background
         sky_color = get_sky_color(tree_height)
-        screen.fill(sky_color)
+        surface.fill(sky_color)
         
         # Add atmospheric layers for depth
         for layer in range(3):
@@ -577,291 +1170,368 @@ while running:
             # Create atmospheric bands
             for band in range(0, 700, 50):
                 band_height = 25 + layer * 5
-                pygame.draw.rect(screen, overlay_color[:3], (0, band + layer * 10, 1100, band_height))
-        
-        # Add subtle cloud-like effects
-        cloud_time = time.time() * 0.2
-        for i in range(6):
-            x = (i * 200 + int(cloud_time * 40 + i * 30)) % 1200 - 100
-            y = 50 + i * 100 + int(20 * abs(((cloud_time + i * 0.3) % 4) - 2))
-            width = 80 + int(40 * (0.5 + 0.5 * abs(((cloud_time * 0.7 + i) % 4) - 2)))
-            height = 30 + int(15 * (0.5 + 0.5 * abs(((cloud_time * 1.1 + i) % 4) - 2)))
-            # Create cloud surface with alpha
-            cloud_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-            cloud_alpha = 20 + int(15 * (0.5 + 0.5 * abs(((cloud_time * 0.9 + i) % 4) - 2)))
-            pygame.draw.ellipse(cloud_surface, (255, 255, 255, cloud_alpha), (0, 0, width, height))
-            screen.blit(cloud_surface, (x, y))
-        draw_instructions([
-            "[C] Calm -> Grow tree slowly +",
-            "[B] Blink -> Water tree ~",
-            "Too many [B] -> Stress -> Shrink !",
-            "Tree evolves: Small->Medium->Large",
-            f"Current stage: {get_tree_stage(tree_height)}",
-            f"Device: {'Connected' if device_connected else 'Keyboard Mode'}",
-            "[R] Reset",
-            "[1,2,3] Change Mode",
-            "[ESC] Quit"
-        ])
-        draw_tree_static(tree_height)
+                pygame.draw.rect(surface, overlay_color[:3], (0, band + layer * 10, 1100, band_height))
+    elif mode == "animated":
+        # Enhanced animated background with dynamic elements
+        surface.fill((30, 100, 160))
+    else:
+        # Enhanced health mode background with wellness theme
+        # Add health-themed gradient overlay (one cached surface per health value)
+        surface.blit(get_health_gradient(health), (0, 0))
 
-        # Show relax message if fully evolved (largest tree at max size)
-        if tree_height >= 42:
-            if message_show_time == 0:
-                message_show_time = time.time()
-            elif time.time() - message_show_time < 7:
-                txt = font.render("*** Your tree is fully grown! You are relaxed now! ***", True, (255, 255, 50))
-                txt_rect = txt.get_rect(center=(550, 50))
-                screen.blit(txt, txt_rect)
-        else:
-            message_show_time = 0
+def draw_static_effects():
+    rects = []
+    # Add subtle cloud-like effects
+    cloud_time = time.time() * 0.2
+    for i in range(6):
+        x = (i * 200 + int(cloud_time * 40 + i * 30)) % 1200 - 100
+        y = 50 + i * 100 + int(20 * abs(((cloud_time + i * 0.3) % 4) - 2))
+        width = 80 + int(40 * (0.5 + 0.5 * abs(((cloud_time * 0.7 + i) % 4) - 2)))
+        height = 30 + int(15 * (0.5 + 0.5 * abs(((cloud_time * 1.1 + i) % 4) - 2)))
+        # Create cloud surface with alpha
+        cloud_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        cloud_alpha = 20 + int(15 * (0.5 + 0.5 * abs(((cloud_time * 0.9 + i) % 4) - 2)))
+        pygame.draw.ellipse(cloud_surface, (255, 255, 255, cloud_alpha), (0, 0, width, height))
+        rects.append(screen.blit(cloud_surface, (x, y)))
+    profiler.lap("clouds")
+    return rects
 
-        # Draw key press indicators
-        draw_key_indicators()
+def draw_animated_effects():
+    rects = []
+    # Add animated wave pattern
+    wave_time = time.time() * 2
+    for y in range(0, 700, 20):
+        wave_offset = int(30 * abs(((wave_time + y * 0.01) % 8) - 4))
+        # Create wave surface with alpha
+        wave_surface = pygame.Surface((1100, 10), pygame.SRCALPHA)
+        wave_alpha = 20 + int(10 * (0.5 + 0.5 * abs(((wave_time * 0.5 + y * 0.005) % 4) - 2)))
+        pygame.draw.rect(wave_surface, (50, 150, 200, wave_alpha), (0, 0, 1100, 10))
+        rects.append(screen.blit(wave_surface, (wave_offset, y)))
+    profiler.lap("waves")
+    
+    # Add floating energy orbs
+    orb_time = time.time() * 1.5
+    for i in range(8):
+        angle = orb_time + i * 0.8
+        x = 550 + int(200 * abs(((angle * 0.3) % 4) - 2) - 200)
+        y = 350 + int(150 * abs(((angle * 0.7) % 4) - 2) - 150)
+        radius = 15 + int(10 * (0.5 + 0.5 * abs(((orb_time + i * 0.5) % 4) - 2)))
+        # Create orb surface with alpha
+        orb_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        alpha = 40 + int(30 * (0.5 + 0.5 * abs(((orb_time * 1.2 + i) % 4) - 2)))
+        pygame.draw.circle(orb_surface, (100, 200, 255, alpha), (radius, radius), radius, 2)
+        rects.append(screen.blit(orb_surface, (x - radius, y - radius)))
+    profiler.lap("orbs")
+    return rects
 
+def draw_health_effects():
+    rects = []
+    health_factor = health / 100.0
+    
+    # Add health pulse visualization
+    pulse_time = time.time() * 3
+    pulse_intensity = 0.5 + 0.5 * (pulse_time % 2)
+    heart_beat = int(30 * pulse_intensity * health_factor)
+    
+    # Pulse rings emanating from center
+    for ring in range(4):
+        ring_radius = 50 + ring * 40 + heart_beat
+        ring_alpha = int((40 - ring * 8) * health_factor)
+        if ring_alpha > 0:
+            # Create ring surface with alpha
+            ring_surface = pygame.Surface((ring_radius * 2, ring_radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(ring_surface, (255, 100 + heart_beat, 100, ring_alpha), (ring_radius, ring_radius), ring_radius, 3)
+            rects.append(screen.blit(ring_surface, (550 - ring_radius, 350 - ring_radius)))
+    profiler.lap("pulse rings")
+    
+    # Add wellness sparkles based on health level
+    sparkle_time = time.time() * 2
+    num_sparkles = int(health_factor * 12)
+    for i in range(num_sparkles):
+        angle = sparkle_time + i * 0.5
+        distance = 100 + int(50 * abs(((angle * 0.3) % 4) - 2))
+        x = 550 + int(distance * abs(((angle * 0.7) % 4) - 2) - distance)
+        y = 350 + int(distance * abs(((angle * 1.1) % 4) - 2) - distance)
+        sparkle_size = 2 + int(3 * (0.5 + 0.5 * abs(((sparkle_time + i * 0.3) % 4) - 2)))
+        alpha = int(100 * health_factor * (0.5 + 0.5 * abs(((sparkle_time * 1.5 + i) % 4) - 2)))
+        if alpha > 0:
+            # Create sparkle surface with alpha
+            sparkle_surface = pygame.Surface((sparkle_size * 2, sparkle_size * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sparkle_surface, (255, 255, 100, alpha), (sparkle_size, sparkle_size), sparkle_size)
+            rects.append(screen.blit(sparkle_surface, (x - sparkle_size, y - sparkle_size)))
+    profiler.lap("sparkles")
+    return rects
+
+def draw_health_bar(shown_health):
+    # Draw health bar background - Enhanced colors
+    rects = [pygame.draw.rect(screen, (100, 100, 100), (450, 660, 200, 20))]  # Darker gray background
+    # Draw current health - Gradient health bar
+    if health > 75:
+        health_color = (0, 255, 0)      # Bright green when high
+    elif health > 50:
+        health_color = (255, 255, 0)    # Yellow when medium
+    elif health > 25:
+        health_color = (255, 165, 0)    # Orange when low
+    else:
+        health_color = (255, 0, 0)      # Red when very low
+    
+    rects.append(pygame.draw.rect(screen, health_color, (450, 660, int(2 * shown_health), 20)))
+    rects.append(screen.blit(render_text(f"Health: {health}/100"), (490, 630)))
+    return rects
+
+# Health mode's running statistics, drawn from one panel that is redrawn only when a
+# shown value changes, and at most every WELLNESS_REFRESH seconds
+WELLNESS_REFRESH = 0.5
+wellness_panel = None
+wellness_panel_values = None
+wellness_panel_time = 0
+
+def draw_wellness_panel():
+    global wellness_panel, wellness_panel_values, wellness_panel_time
+    now = time.time()
+    if wellness_panel is None:
+        wellness_panel = pygame.Surface((210, 100), pygame.SRCALPHA)
+    if now - wellness_panel_time >= WELLNESS_REFRESH:
+        values = (round(wellness.calm_percent), round(wellness.blinks_per_minute),
+                  int(wellness.longest_calm_seconds), wellness.trend)
+        if values != wellness_panel_values:
+            calm_percent, blink_rate, longest, trend = values
+            lines = [
+                f"Calm (last min): {calm_percent}%",
+                f"Blinks: {blink_rate}/min",
+                f"Longest calm: {longest // 60}:{longest % 60:02d}",
+                f"Trend: {trend}",
+            ]
+            wellness_panel.fill((0, 0, 0, 120))
+            for i, line in enumerate(lines):
+                wellness_panel.blit(render_text(line, 24, (220, 255, 220)), (10, 8 + 22 * i))
+            wellness_panel_values = values
+        wellness_panel_time = now
+    # Top right, clear of the instructions and the relax message
+    return [screen.blit(wellness_panel, wellness_panel.get_rect(topright=(1090, 10)))]
+
+def draw_calm_meter():
+    """Current EEG calm level as a bar in the bottom left corner"""
+    rects = [screen.blit(render_text("Calm", 24, (200, 255, 200)), (10, 672))]
+    rects.append(pygame.draw.rect(screen, (60, 60, 60), (60, 675, 150, 14)))
+    rects.append(pygame.draw.rect(screen, (100, 220, 140), (60, 675, int(150 * calm_level), 14)))
+    return rects
+
+def draw_relax_message(reached, text, duration):
+    """Show text for duration seconds once the goal is reached"""
+    global message_show_time
+    if not reached:
+        message_show_time = 0
+        return []
+    if message_show_time == 0:
+        message_show_time = time.time()
+    elif time.time() - message_show_time < duration:
+        txt = render_text(text, 28, (255, 255, 50))
+        return [screen.blit(txt, txt.get_rect(center=(550, 50)))]
+    return []
+
+def interpolate(previous, current, alpha):
+    return previous + (current - previous) * alpha
+
+def draw_scene(mode, alpha=1.0):
+    """Draw everything above the background layer, returning the damaged rectangles.
+    Growth is drawn alpha of the way through the last simulation step."""
+    if mode == "static":
+        rects = draw_static_effects()
     elif mode == "animated":
-        # Enhanced animated background with dynamic elements
-        base_color = (30, 100, 160)
-        screen.fill(base_color)
-        
-        # Add animated wave pattern
-        wave_time = time.time() * 2
-        for y in range(0, 700, 20):
-            wave_offset = int(30 * abs(((wave_time + y * 0.01) % 8) - 4))
-            # Create wave surface with alpha
-            wave_surface = pygame.Surface((1100, 10), pygame.SRCALPHA)
-            wave_alpha = 20 + int(10 * (0.5 + 0.5 * abs(((wave_time * 0.5 + y * 0.005) % 4) - 2)))
-            pygame.draw.rect(wave_surface, (50, 150, 200, wave_alpha), (0, 0, 1100, 10))
-            screen.blit(wave_surface, (wave_offset, y))
-        
-        # Add floating energy orbs
-        orb_time = time.time() * 1.5
-        for i in range(8):
-            angle = orb_time + i * 0.8
-            x = 550 + int(200 * abs(((angle * 0.3) % 4) - 2) - 200)
-            y = 350 + int(150 * abs(((angle * 0.7) % 4) - 2) - 150)
-            radius = 15 + int(10 * (0.5 + 0.5 * abs(((orb_time + i * 0.5) % 4) - 2)))
-            # Create orb surface with alpha
-            orb_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            alpha = 40 + int(30 * (0.5 + 0.5 * abs(((orb_time * 1.2 + i) % 4) - 2)))
-            pygame.draw.circle(orb_surface, (100, 200, 255, alpha), (radius, radius), radius, 2)
-            screen.blit(orb_surface, (x - radius, y - radius))
-        draw_instructions([
-            "[C] Calm -> Tree grows +",
-            "[B] Blink -> Tree grows/shrinks *", 
-            f"Device: {'Connected' if device_connected else 'Keyboard Mode'}",
-            "[R] Reset",
-            "[1,2,3] Change Mode",
-            "[ESC] Quit"
-        ])
-        
-        # Add white circular fade area around the animated image
-        if animated_frames:
-            frame = animated_frames[frame_index]
-            frame_rect = frame.get_rect(center=(550, 350))
-            
-            # Create circular white fade effect
-            circle_center = (550, 350)
-            max_radius = 200  # Maximum radius of the white circle
-            
-            # Draw multiple circles with decreasing alpha to create fade effect
-            for radius in range(max_radius, 0, -10):
-                # Calculate alpha based on distance from center (closer = more white)
-                alpha = int(255 * (max_radius - radius) / max_radius * 0.3)  # 0.3 controls fade intensity
-                if alpha > 0:
-                    # Create circle surface with alpha
-                    circle_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-                    pygame.draw.circle(circle_surface, (255, 255, 255, alpha), (radius, radius), radius)
-                    screen.blit(circle_surface, (circle_center[0] - radius, circle_center[1] - radius))
-        
-        draw_animated_frame(frame_index)
+        rects = draw_animated_effects()
+    else:
+        rects = draw_health_effects()
+    # Above the effects, as they would otherwise wash the text out
+    rects += draw_instructions(get_instructions(mode))
+    profiler.lap("instructions")
 
+    if mode == "static":
+        rects += draw_tree_static(interpolate(previous_tree_height, tree_height, alpha))
+        profiler.lap("tree")
+        # Show relax message if fully evolved (largest tree at max size)
+        rects += draw_relax_message(tree_height >= 42, "*** Your tree is fully grown! You are relaxed now! ***", 7)
+    elif mode == "animated":
+        rects += draw_animated_frame(frame_index)
         # Relax message
-        if frame_index == len(animated_frames) - 1:
-            if message_show_time == 0:
-                message_show_time = time.time()
-            elif time.time() - message_show_time < 3:
-                txt = font.render("*** You are relaxed now! ***", True, (255, 255, 50))
-                txt_rect = txt.get_rect(center=(550, 50))
-                screen.blit(txt, txt_rect)
-        else:
-            message_show_time = 0
+        rects += draw_relax_message(frame_index == len(animated_frames) - 1, "*** You are relaxed now! ***", 3)
+    else:
+        rects += draw_animated_frame(frame_index)
+        rects += draw_health_bar(interpolate(previous_health, health, alpha))
+        profiler.lap("health bar")
+        rects += draw_wellness_panel()
+        profiler.lap("wellness")
+        rects += draw_relax_message(health >= 100, "*** You are relaxed now! ***", 3)
 
-        # Draw key press indicators
-        draw_key_indicators()
+    # Draw key press indicators
+    rects += draw_key_indicators()
+    if device_connected:
+        rects += draw_calm_meter()
+    profiler.lap("hud")
+    return rects
 
-    elif mode == "health":
-        # Enhanced health mode background with wellness theme
-        base_color = (20, 80, 120)
-        screen.fill(base_color)
-        
-        # Add health-themed gradient overlay
-        health_factor = health / 100.0
-        for y in range(700):
-            gradient_factor = y / 700
-            # Health influences the background color
-            health_influence = int(health_factor * 50)
-            color = (
-                base_color[0] + int(gradient_factor * 20) + health_influence // 3,
-                base_color[1] + int(gradient_factor * 30) + health_influence // 2,
-                base_color[2] + int(gradient_factor * 40) + health_influence
-            )
-            # Ensure colors don't exceed 255
-            color = (min(255, color[0]), min(255, color[1]), min(255, color[2]))
-            pygame.draw.line(screen, color, (0, y), (1100, y))
-        
-        # Add health pulse visualization
-        pulse_time = time.time() * 3
-        pulse_intensity = 0.5 + 0.5 * (pulse_time % 2)
-        heart_beat = int(30 * pulse_intensity * health_factor)
-        
-        # Pulse rings emanating from center
-        for ring in range(4):
-            ring_radius = 50 + ring * 40 + heart_beat
-            ring_alpha = int((40 - ring * 8) * health_factor)
-            if ring_alpha > 0:
-                # Create ring surface with alpha
-                ring_surface = pygame.Surface((ring_radius * 2, ring_radius * 2), pygame.SRCALPHA)
-                pygame.draw.circle(ring_surface, (255, 100 + heart_beat, 100, ring_alpha), (ring_radius, ring_radius), ring_radius, 3)
-                screen.blit(ring_surface, (550 - ring_radius, 350 - ring_radius))
-        
-        # Add wellness sparkles based on health level
-        sparkle_time = time.time() * 2
-        num_sparkles = int(health_factor * 12)
-        for i in range(num_sparkles):
-            angle = sparkle_time + i * 0.5
-            distance = 100 + int(50 * abs(((angle * 0.3) % 4) - 2))
-            x = 550 + int(distance * abs(((angle * 0.7) % 4) - 2) - distance)
-            y = 350 + int(distance * abs(((angle * 1.1) % 4) - 2) - distance)
-            sparkle_size = 2 + int(3 * (0.5 + 0.5 * abs(((sparkle_time + i * 0.3) % 4) - 2)))
-            alpha = int(100 * health_factor * (0.5 + 0.5 * abs(((sparkle_time * 1.5 + i) % 4) - 2)))
-            if alpha > 0:
-                # Create sparkle surface with alpha
-                sparkle_surface = pygame.Surface((sparkle_size * 2, sparkle_size * 2), pygame.SRCALPHA)
-                pygame.draw.circle(sparkle_surface, (255, 255, 100, alpha), (sparkle_size, sparkle_size), sparkle_size)
-                screen.blit(sparkle_surface, (x - sparkle_size, y - sparkle_size))
-        draw_instructions([
-            "[C] Calm -> Health + +",
-            "[B] Blink -> Health grows/shrinks *",
-            f"Device: {'Connected' if device_connected else 'Keyboard Mode'}",
-            "[R] Reset",
-            "[1,2,3] Change Mode",
-            "[ESC] Quit"
-        ])
-        
-        # Add white circular fade area around the animated image
-        if animated_frames:
-            frame = animated_frames[frame_index]
-            frame_rect = frame.get_rect(center=(550, 350))
-            
-            # Create circular white fade effect
-            circle_center = (550, 350)
-            max_radius = 200  # Maximum radius of the white circle
-            
-            # Draw multiple circles with decreasing alpha to create fade effect
-            for radius in range(max_radius, 0, -10):
-                # Calculate alpha based on distance from center (closer = more white)
-                alpha = int(255 * (max_radius - radius) / max_radius * 0.3)  # 0.3 controls fade intensity
-                if alpha > 0:
-                    # Create circle surface with alpha
-                    circle_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-                    pygame.draw.circle(circle_surface, (255, 255, 255, alpha), (radius, radius), radius)
-                    screen.blit(circle_surface, (circle_center[0] - radius, circle_center[1] - radius))
-        
-        draw_animated_frame(frame_index)
-        # Draw health bar background - Enhanced colors
-        pygame.draw.rect(screen, (100, 100, 100), (450, 660, 200, 20))  # Darker gray background
-        # Draw current health - Gradient health bar
-        if health > 75:
-            health_color = (0, 255, 0)      # Bright green when high
-        elif health > 50:
-            health_color = (255, 255, 0)    # Yellow when medium
-        elif health > 25:
-            health_color = (255, 165, 0)    # Orange when low
-        else:
-            health_color = (255, 0, 0)      # Red when very low
-        
-        pygame.draw.rect(screen, health_color, (450, 660, 2 * health, 20))
-        txt = font.render(f"Health: {health}/100", True, (255, 255, 255))
-        screen.blit(txt, (490, 630))
-
-        if health >= 100:
-            if message_show_time == 0:
-                message_show_time = time.time()
-            elif time.time() - message_show_time < 3:
-                txt = font.render("*** You are relaxed now! ***", True, (255, 255, 50))
-                txt_rect = txt.get_rect(center=(550, 50))
-                screen.blit(txt, txt_rect)
-        else:
-            message_show_time = 0
+# Per-stage timings of the main loop, recorded while profiling is enabled
+profiler = FrameProfiler()
+profile_always = False  # --profile or --profile-out, which record the whole session
+PROFILE_OVERLAY_REFRESH = 0.5  # Seconds between overlay updates
+show_profile_overlay = False
+profile_overlay = None
+profile_overlay_time = 0
 
-        # Draw key press indicators for health mode
-        draw_key_indicators()
+def make_profile_overlay():
+    """Render FPS and mean ms per stage over the last frames onto a translucent panel,
+    plus the EEG queue while a device is connected"""
+    fps, stages = profiler.summary()
+    rows = [(name, f"{ms:.2f} ms") for name, ms in stages]
+    if eeg_acquisition:
+        metrics = eeg_acquisition.metrics()
+        rows.append(("eeg queue", f"{metrics['queue_depth']} (max {metrics['max_queue_depth']})"))
+        rows.append(("eeg dropped", str(metrics["dropped"])))
+        if metrics["errors"]:
+            rows.append(("eeg receive errors", str(metrics["errors"])))
+        if metrics["error"]:
+            rows.append(("eeg stopped", metrics["error"][:24]))
+    if frame_capture:
+        rows.append(("capture dropped", f"{frame_capture.dropped} of {frame_capture.captured + frame_capture.dropped}"))
+    font = get_font(22)
+    panel = pygame.Surface((250, 30 + 20 * len(rows)), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 160))
+    panel.blit(font.render(f"{fps:.1f} FPS", True, (255, 255, 0)), (10, 8))
+    for i, (name, text) in enumerate(rows):
+        value = font.render(text, True, (255, 255, 255))
+        panel.blit(font.render(name, True, (200, 200, 200)), (10, 28 + 20 * i))
+        panel.blit(value, (240 - value.get_width(), 28 + 20 * i))
+    return panel
 
-    # Leaves animation
-    for leaf in leaves:
-        leaf.update()
-        leaf.draw()
+def draw_profile_overlay():
+    global profile_overlay, profile_overlay_time
+    if not show_profile_overlay:
+        return []
+    # Numbers change every frame, so they are rendered directly instead of through the text cache
+    now = time.time()
+    if profile_overlay is None or now - profile_overlay_time >= PROFILE_OVERLAY_REFRESH:
+        profile_overlay = make_profile_overlay()
+        profile_overlay_time = now
+    # Bottom right, clear of the instructions and key indicators
+    return [screen.blit(profile_overlay, profile_overlay.get_rect(bottomright=(1090, 690)))]
 
-    # Water drops animation
-    for drop in water_drops[:]:
-        drop.update()
-        drop.draw()
-        if drop.alpha <= 0:
-            water_drops.remove(drop)
+def toggle_profile_overlay():
+    """Show or hide the overlay, recording timings while it is visible"""
+    global show_profile_overlay, profile_overlay
+    show_profile_overlay = not show_profile_overlay
+    profile_overlay = None
+    profiler.enable(show_profile_overlay or profile_always)
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+class SceneRenderer:
+    """Presents frames with a full flip, or in dirty-rect mode by restoring and
+    updating only the rectangles drawn this frame and the previous one"""
+    def __init__(self, dirty_rects=False):
+        self.dirty_rects = dirty_rects
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background_key = None
+        self.full_redraw = True
+        self.damaged = []
 
-    keys = pygame.key.get_pressed()
-    current_time = time.time()
+    def begin(self, key, draw_background):
+        """Put the background back, redrawing the cached layer only when key changes"""
+        self.full_redraw = not self.dirty_rects or key != self.background_key
+        if key != self.background_key:
+            draw_background(self.background)
+            self.background_key = key
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.damaged:
+                screen.blit(self.background, rect, rect)
 
-    # Remove old blink times (>3 sec ago)
-    blink_times = [t for t in blink_times if current_time - t < 3]
+    def present(self, rects):
+        if self.full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.damaged + rects)
+        if self.dirty_rects:
+            screen_rect = screen.get_rect()
+            self.damaged = [rect.clip(screen_rect) for rect in rects]
+            self.damaged = [rect for rect in self.damaged if rect.width and rect.height]
 
+def handle_session_keys(mode, keys):
+    """Quit, reset and mode switching, checked once per rendered frame.
+    Returns the mode to continue in, or None to end the session."""
     if keys[pygame.K_ESCAPE]:
         record_key_press(pygame.K_ESCAPE)
-        running = False
+        return None
 
     if keys[pygame.K_r]:
         record_key_press(pygame.K_r)
         reset_game_state()
 
     # Mode switching in-game
-    if keys[pygame.K_1]:
-        record_key_press(pygame.K_1)
-        mode = "static"
-        reset_game_state()
-    elif keys[pygame.K_2]:
-        record_key_press(pygame.K_2)
-        mode = "animated"
-        reset_game_state()
-    elif keys[pygame.K_3]:
-        record_key_press(pygame.K_3)
-        mode = "health"
-        reset_game_state()
+    for key, new_mode in ((pygame.K_1, "static"), (pygame.K_2, "animated"), (pygame.K_3, "health")):
+        if keys[key]:
+            record_key_press(key)
+            activate_mode(new_mode)
+            reset_game_state()
+            return new_mode
+    return mode
+
+def get_calm_drive(keys, replay=None):
+    """Calm level for this frame from the replay, the EEG device or the [C] key"""
+    if replay and "calm" in replay.samples:
+        return float(replay.frame_samples("calm")[0, 0])
+    if eeg_acquisition:
+        # Rounded as recordings store it, so a replay steps with exactly the same value
+        return float(np.float32(eeg_acquisition.state.calm))
+    return 1.0 if keys[pygame.K_c] else 0.0
+
+def get_device_blinks(replay=None):
+    """Blinks the EEG device detected since the last call, or the recorded count for this frame"""
+    global eeg_blinks_seen
+    if replay and "blinks" in replay.samples:
+        return int(replay.frame_samples("blinks")[0, 0])
+    if eeg_acquisition:
+        blinks = eeg_acquisition.state.blinks
+        new_blinks, eeg_blinks_seen = blinks - eeg_blinks_seen, blinks
+        return new_blinks
+    return 0
+
+def play_water_sound():
+    if water_sound:
+        water_sound.play()
+        if frame_capture:
+            frame_capture.sound("assets/water.wav", water_sound.get_volume())
+
+def step_simulation(mode, calm_drive, blinks=0):
+    """Advance growth and particles by one fixed timestep, applying blinks new since the last step"""
+    global tree_height, health, frame_index, sim_time, previous_tree_height, previous_health
+    global calm_progress
+    previous_tree_height, previous_health = tree_height, health
+    sim_time += SIM_DT
+
+    leaves.update()
+    water_drops.update()
 
     # Game logic for each mode
 
-    # Calm always grows
-    if keys[pygame.K_c]:
-        record_key_press(pygame.K_c)
+    # Calm always grows, at full speed while [C] is held
+    if calm_drive > 0:
+        if calm_drive >= CALM_INDICATOR_LEVEL:
+            record_key_press(pygame.K_c)
+        # Frames and health grow in whole steps, the remainder carries over
+        calm_progress += calm_drive
+        calm_steps = int(calm_progress)
+        calm_progress -= calm_steps
         if mode == "static":
-            tree_height += 0.5  # Slower, more gradual growth (2 by 2 steps)
+            tree_height += 0.5 * calm_drive  # Slower, more gradual growth (2 by 2 steps)
         elif mode == "animated":
-            if frame_index < len(animated_frames) - 1:
-                frame_index += 1
+            frame_index = min(len(animated_frames) - 1, frame_index + calm_steps)
         elif mode == "health":
-            if health < 100:
-                health += 1
-            if frame_index < len(animated_frames) - 1:
-                frame_index += 1
+            health = min(100, health + calm_steps)
+            frame_index = min(len(animated_frames) - 1, frame_index + calm_steps)
 
     # Blink grows or shrinks based on blink frequency, same logic for all modes
-    if keys[pygame.K_b]:
+    for _ in range(blinks):
         record_key_press(pygame.K_b)
-        blink_times.append(current_time)
-        if len(blink_times) > 4:
+        if blink_window.add(sim_time):
             # Too many blinks → shrink/stress
             if mode == "static":
                 tree_height -= 0.5  # Slower shrinking too
@@ -874,26 +1544,22 @@ while running:
             # Moderate blinks → grow/water
             if mode == "static":
                 tree_height += 0.7  # Slightly faster than calm, but still gradual
-                if water_sound:
-                    water_sound.play()
+                play_water_sound()
                 # Create multiple water drops for better visual effect
-                for i in range(3):
-                    water_drops.append(WaterDrop(550 + i * 20 - 20, 700 - int(tree_height) - 20))  # Center of window
+                water_drops.spawn(WATER_DROP_XS, 700 - int(tree_height) - 20)  # Center of window
             elif mode == "animated":
                 frame_index = min(len(animated_frames) - 1, frame_index + 2)
-                if water_sound:
-                    water_sound.play()
+                play_water_sound()
                 # Create multiple water drops for better visual effect
-                for i in range(3):
-                    water_drops.append(WaterDrop(550 + i * 20 - 20, 700 - frame_index - 20))  # Center of window
+                water_drops.spawn(WATER_DROP_XS, 700 - frame_index - 20)  # Center of window
             elif mode == "health":
                 health = min(100, health + 1)
                 frame_index = min(len(animated_frames) - 1, frame_index + 1)
-                if water_sound:
-                    water_sound.play()
+                play_water_sound()
                 # Create multiple water drops for better visual effect
-                for i in range(3):
-                    water_drops.append(WaterDrop(550 + i * 20 - 20, 700 - frame_index - 20))  # Center of window
+                water_drops.spawn(WATER_DROP_XS, 700 - frame_index - 20)  # Center of window
+
+    wellness.update(calm_drive, blinks)
 
     # Clamp values to valid ranges
     if mode == "static":
@@ -904,7 +1570,355 @@ while running:
         health = max(0, min(100, health))
         frame_index = max(0, min(len(animated_frames) - 1, frame_index))
 
-    pygame.display.flip()
-    clock.tick(30)
+def full_growth():
+    """Per mode, the column and value its growth is clamped to, for the session log"""
+    # Before animated mode is first used, count the frames it will load
+    frames = len(animated_frames) or (len(frame_atlas["order"]) if frame_atlas is not None else len(frame_paths))
+    return {"static": ["tree_height", 42], "animated": ["frame_index", frames - 1], "health": ["health", 100]}
+
+def run_session(mode, get_keys=None, fps=30, max_frames=None, dirty_rects=False, on_frame=None, lockstep=False,
+                recorder=None, replay=None, render=True, time_scale=1.0, session_log=None):
+    """Run the game loop until quit, or for max_frames frames, returning the final mode.
+
+    get_keys replaces pygame.key.get_pressed for scripted input, fps=0 runs
+    uncapped and on_frame is called after every presented frame. The
+    simulation runs at SIM_RATE steps per second of real time, or with
+    lockstep exactly one step per rendered frame (for reproducible headless runs).
+    recorder captures the input of every frame; replay supplies it instead of
+    the keyboard and the clock, and ends the session when it runs out.
+    render=False only advances the simulation. time_scale speeds the
+    simulation up along with a recording played back faster than real time,
+    and the session ends when that recording does. session_log gets a row
+    for every simulation step.
+    """
+    global calm_level
+    get_keys = get_keys or pygame.key.get_pressed
+    renderer = SceneRenderer(dirty_rects)
+    frames = 0
+    running = True
+    accumulator = 0.0
+    previous_time = time.perf_counter()
+    blink_key_held = False
+    pending_blinks = 0  # Blinks waiting for the next simulation step
+    if eeg_acquisition and not replay:
+        get_device_blinks()  # Blinks while in the menu don't count
+
+    while running:
+        profiler.start_frame()
+        # Checked before this frame reads the EEG state, so the last of a recording still applies
+        playback_finished = eeg_acquisition is not None and eeg_acquisition.finished and not replay
+        if eeg_acquisition is not None and eeg_acquisition.failed and not replay:
+            # Nothing drives calm or blinks any more; the session ends rather than carrying on without the device
+            print(f"EEG stopped with {eeg_acquisition.state.error}, ending the session")
+            break
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                toggle_profile_overlay()
+
+        if replay:
+            frame = replay.next_frame()
+            if frame is None:
+                break
+            steps, keys = frame
+        else:
+            keys = get_keys()
+        next_mode = handle_session_keys(mode, keys)
+        if next_mode is None:
+            break
+        mode = next_mode
+        # Prefetches finishing during the session count against the budget too
+        resources.evict(keep=MODE_RESOURCES[mode])
+        calm_level = get_calm_drive(keys, replay)
+        # [B] is one blink per press, however long it is held
+        device_blinks = get_device_blinks(replay)
+        pending_blinks += device_blinks + int(keys[pygame.K_b] and not blink_key_held)
+        blink_key_held = keys[pygame.K_b]
+
+        # Run as many fixed steps as real time calls for, keys held this frame apply to all of them
+        if replay:
+            alpha = 1.0
+        elif lockstep:
+            steps, alpha = 1, 1.0
+        else:
+            now = time.perf_counter()
+            accumulator += min(now - previous_time, MAX_FRAME_TIME) * time_scale
+            previous_time = now
+            steps = int(accumulator / SIM_DT)
+            accumulator -= steps * SIM_DT
+            alpha = accumulator / SIM_DT
+        eeg_samples = drain_eeg_samples()
+        if recorder:
+            recorder.record_frame(steps, keys)
+            if device_connected:
+                recorder.record_samples("calm", [[calm_level]])
+                recorder.record_samples("blinks", [[device_blinks]])
+            if eeg_samples is not None and len(eeg_samples):
+                recorder.record_samples("eeg", eeg_samples)
+        if session_log and steps:
+            mode_index, keys_mask, band_power = MODES.index(mode), key_mask(keys), get_band_power_means()
+        for _ in range(steps):
+            blinks = pending_blinks
+            step_simulation(mode, calm_level, blinks)
+            pending_blinks = 0
+            if session_log:
+                session_log.append((sim_time, mode_index, tree_height, health, frame_index, keys_mask, calm_level,
+                                    blinks, *band_power))
+        profiler.lap("simulation")
+
+        if render:
+            renderer.begin(get_background_key(mode), lambda surface: draw_background(surface, mode))
+            profiler.lap("background")
+            rects = draw_scene(mode, alpha)
+
+            # Leaves and water drops
+            rects += leaves.draw(alpha)
+            profiler.lap("leaves")
+            rects += water_drops.draw(alpha)
+            profiler.lap("water drops")
+
+            rects += draw_profile_overlay()
+            profiler.lap("overlay")
+            renderer.present(rects)
+            profiler.lap("present")
+            if frame_capture:
+                frame_capture.capture(screen)
+                profiler.lap("capture")
+        # Replays pace themselves
+        clock.tick(0 if replay else fps)
+        profiler.lap("wait")
+        profiler.end_frame()
+
+        frames += 1
+        if on_frame:
+            on_frame(frames)
+        if max_frames is not None and frames >= max_frames or playback_finished:
+            running = False
+    return mode
+
+MODES = ["static", "animated", "health"]
+# One row per simulation tick in the session log; band powers are channel means, NaN without a device
+SESSION_LOG_COLUMNS = [
+    ("time", "<f8"), ("mode", "u1"), ("tree_height", "<f4"), ("health", "<f4"), ("frame_index", "<i2"),
+    ("keys", "<u2"), ("calm", "<f4"), ("blinks", "u1"), ("theta", "<f4"), ("alpha", "<f4"), ("beta", "<f4"),
+]
+
+def get_band_power_means():
+    if eeg_acquisition:
+        return tuple(eeg_acquisition.state.band_power.mean(axis=0).tolist())
+    return (math.nan,) * len(eeg.BANDS)
+
+def session_state(mode):
+    """Simulation state that a replay must reproduce exactly"""
+    return {
+        "mode": mode,
+        "steps": round(sim_time / SIM_DT),
+        "tree_height": tree_height,
+        "health": health,
+        "frame_index": frame_index,
+        "water_drops": len(water_drops),
+        "leaves_y": round(float(leaves.y.sum()), 3),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="NeuroNest: Relax to Grow")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw and update the parts of the screen that changed (low-power displays)")
+    parser.add_argument("--memory-budget", type=int, default=48, metavar="MB",
+                        help="image memory, prefetched images included, above which resources of other modes are evicted (default: 48)")
+    parser.add_argument("--fps", type=int, default=30,
+                        help="frame rate cap, 0 for uncapped; growth speed does not depend on it (default: 30)")
+    parser.add_argument("--profile", action="store_true",
+                        help="record per-stage frame timings from the start (F3 toggles the timing overlay)")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="on exit, write the recorded timings as CSV (.csv) or a Chrome trace (.json); implies --profile")
+    parser.add_argument("--eeg-source", metavar="SOURCE",
+                        help="EEG source connected with [D]: synthetic, udp://host:port, tcp://host:port "
+                             "or a .csv/.neeg recording (default: synthetic)")
+    parser.add_argument("--eeg-rate", type=int, default=250, metavar="HZ", help="EEG sample rate (default: 250)")
+    parser.add_argument("--eeg-channels", type=int, default=8, help="EEG channel count (default: 8)")
+    parser.add_argument("--eeg-speed", type=float, default=1.0, metavar="X",
+                        help="play a recording X times faster than real time, the session speeding up with it (default: 1)")
+    parser.add_argument("--eeg-mains", type=int, choices=[50, 60], default=50, metavar="HZ",
+                        help="local power line frequency to filter out, 50 or 60 (default: 50)")
+    parser.add_argument("--user", default="default",
+                        help="whose calibration profile to load and save (default: default)")
+    parser.add_argument("--calibration-seconds", type=int, default=60, metavar="N",
+                        help=f"length of a calibration from the start menu, "
+                             f"{eeg.calibration.MIN_SECONDS}-{eeg.calibration.MAX_SECONDS} (default: 60)")
+    parser.add_argument("--seed", type=int, help="random seed for particles (default: random)")
+    parser.add_argument("--record", metavar="PATH", help="record the session's input to PATH (.npz)")
+    parser.add_argument("--session-log", metavar="PATH",
+                        help="where to log every simulation step (default: a new file in data/sessions)")
+    parser.add_argument("--no-session-log", action="store_true", help="do not log the session")
+    parser.add_argument("--replay", metavar="PATH", help="replay a recorded session instead of reading the keyboard")
+    parser.add_argument("--replay-speed", type=float, default=1.0, metavar="X",
+                        help="replay pacing relative to real time, 0 for as fast as possible (default: 1)")
+    parser.add_argument("--mode", choices=MODES,
+                        help="start in this mode without the start menu, connected to --eeg-source if one is given")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="capture the session with its sounds to a video (.mp4, .mkv, .mov, .webm, needs ffmpeg) "
+                             "or else to a directory of PNG frames")
+    parser.add_argument("--capture-fps", type=int, default=30, metavar="N",
+                        help="frames captured per second (default: 30)")
+    parser.add_argument("--no-render", action="store_true",
+                        help="with --replay, or --mode and a recording as --eeg-source, only run the simulation")
+    args = parser.parse_args(argv)
+    playback = args.mode and args.eeg_source and eeg.is_recording(args.eeg_source)
+    if args.no_render and not (args.replay or playback):
+        parser.error("--no-render needs --replay, or --mode with a recording as --eeg-source")
+    if args.capture and args.no_render:
+        parser.error("--capture needs rendering, not --no-render")
+    if args.capture and is_video(args.capture) and not find_ffmpeg():
+        parser.error("capturing video needs ffmpeg on the PATH; give a directory to capture PNG frames")
+    if args.capture_fps <= 0:
+        parser.error("--capture-fps must be positive")
+    if args.session_log and args.no_session_log:
+        parser.error("--session-log and --no-session-log cannot be combined")
+    if args.eeg_speed <= 0:
+        parser.error("--eeg-speed must be positive")
+    if not eeg.calibration.MIN_SECONDS <= args.calibration_seconds <= eeg.calibration.MAX_SECONDS:
+        parser.error(f"--calibration-seconds must be {eeg.calibration.MIN_SECONDS}-{eeg.calibration.MAX_SECONDS}")
+    if not args.user or os.sep in args.user or args.user.startswith("."):
+        parser.error("--user must be a plain name")
+    return args
+
+def init_display():
+    global screen, clock
+    # Initialize Pygame and mixer
+    pygame.init()
+    pygame.mixer.init()
+
+    screen = pygame.display.set_mode((1100, 700))  # Updated window size
+    pygame.display.set_caption("NeuroNest: Relax to Grow")
+    clock = pygame.time.Clock()
+
+def load_sounds(play_music=True):
+    global water_sound
+    # Load background music (optional) - RESTORED
+    if play_music:
+        try:
+            pygame.mixer.music.load("assets/calm.mp3")
+            pygame.mixer.music.set_volume(0.3)  # Background music restored at moderate volume
+            pygame.mixer.music.play(-1)
+        except Exception:
+            pass
+
+    # Load water sound - ENHANCED FOR RECORDING
+    try:
+        water_sound = pygame.mixer.Sound("assets/water.wav")
+        water_sound.set_volume(0.8)  # Louder water sounds for clear recording
+    except Exception:
+        water_sound = None
+
+def start_capture(path, fps):
+    global frame_capture
+    frame_capture = FrameCapture(path, screen, fps)
+    # The music has been playing since launch; the capture loops it from its own start
+    if pygame.mixer.music.get_busy():
+        frame_capture.sound("assets/calm.mp3", pygame.mixer.music.get_volume(), loop=True)
+
+def init_resources(memory_budget_mb=48):
+    global resources
+    resources = ResourceManager(RESOURCES, memory_budget_mb * 1024 * 1024)
+
+def seed_random(seed):
+    """Make particle spawning reproducible"""
+    global rng, leaves
+    rng = np.random.default_rng(seed)
+    leaves = LeafPool(20)
+
+def main(argv=None):
+    global device_connected, eeg_source_spec, eeg_rate, eeg_channels, eeg_mains, eeg_speed
+    global user_name, calibration, calibration_seconds, profile_always
+    args = parse_args(argv)
+    eeg_source_spec, eeg_rate, eeg_channels = args.eeg_source or "synthetic", args.eeg_rate, args.eeg_channels
+    eeg_mains, eeg_speed = args.eeg_mains, args.eeg_speed
+    user_name, calibration_seconds = args.user, args.calibration_seconds
+    calibration = eeg.load_profile(get_profile_path())
+    if calibration:
+        print(f"Loaded calibration for {user_name} from {calibration['created']}")
+    load_history()
+    init_display()
+    load_sounds()
+    init_resources(args.memory_budget)
+    profile_always = args.profile or args.profile_out is not None
+    profiler.enable(profile_always)
+
+    # Decode every mode's images in the background while the menu is showing
+    resources.prefetch(["trees", "frames"])
+    print(f"Startup took {(time.perf_counter() - startup_begin) * 1000:.0f} ms")
+    replay = InputReplay(args.replay, args.replay_speed) if args.replay else None
+    if replay:
+        # A replay starts where the recording did, without the menu
+        mode, device_connected, seed = replay.header["mode"], replay.header["device_connected"], replay.header["seed"]
+        if replay.header["sim_rate"] != SIM_RATE:
+            print(f"Warning: recorded at {replay.header['sim_rate']} steps/s, simulating at {SIM_RATE}")
+    elif args.mode:
+        mode, device_connected = args.mode, False
+        if args.eeg_source:
+            error = connect_eeg()
+            if error:
+                raise SystemExit(f"Cannot connect to {eeg_source_spec}: {error}")
+            device_connected = True
+    else:
+        mode, device_connected = show_start_menu()
+    if not replay:
+        seed = args.seed if args.seed is not None else int.from_bytes(os.urandom(4), "little")
+    seed_random(seed)
+    activate_mode(mode)
+    reset_game_state()
+    recorder = None
+    if args.record:
+        header = {"mode": mode, "device_connected": device_connected, "seed": seed, "sim_rate": SIM_RATE}
+        if eeg_acquisition:
+            header.update(eeg_source=eeg_acquisition.source.description, eeg_rate=eeg_acquisition.source.rate)
+        recorder = InputRecorder(args.record, header)
+    session_log = None
+    # Replays are only logged when asked to
+    if args.session_log or not (replay or args.no_session_log):
+        path = args.session_log or get_session_log_path()
+        header = {"user": user_name, "mode": mode, "modes": MODES, "seed": seed, "sim_rate": SIM_RATE,
+                  "device_connected": device_connected, "full_growth": full_growth()}
+        if eeg_acquisition:
+            header.update(eeg_source=eeg_acquisition.source.description, eeg_rate=eeg_acquisition.source.rate)
+        session_log = SessionLog(path, SESSION_LOG_COLUMNS, header)
+
+    if args.capture:
+        start_capture(args.capture, args.capture_fps)
+    session_start = time.perf_counter()
+    started = time.strftime("%Y-%m-%d %H:%M:%S")
+    # A recording played back faster speeds up the whole session with it
+    playing_back = device_connected and not replay and eeg.is_recording(eeg_source_spec)
+    mode = run_session(mode, fps=args.fps, dirty_rects=args.dirty_rects, recorder=recorder, replay=replay,
+                       render=not args.no_render, time_scale=eeg_speed if playing_back else 1.0,
+                       session_log=session_log)
+    device_failed = device_connected and not replay and eeg_acquisition.failed
+    if playing_back and eeg_acquisition.finished and not device_failed:
+        print(f"Played back {eeg_acquisition.state.samples / eeg_acquisition.source.rate:.0f} s of EEG "
+              f"in {time.perf_counter() - session_start:.1f} s, ending at {json.dumps(session_state(mode))}")
+
+    replay_matched = True
+    if frame_capture:
+        frame_capture.close()
+    if session_log:
+        session_log.close()
+    # Replays repeat a session already in the history
+    if not replay:
+        record_history(mode, started, session_log)
+    if recorder:
+        recorder.save(session_state(mode))
+    if replay:
+        print(f"Replayed {replay.index} of {len(replay)} frames in {time.perf_counter() - session_start:.1f} s")
+        replay_matched = replay.check(session_state(mode))
+    disconnect_eeg()
+    print_cache_stats()
+    if args.profile_out:
+        profiler.export(args.profile_out)
+    pygame.quit()
+    if not replay_matched or device_failed:
+        raise SystemExit(1)
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Per-stage frame timing for the main loop.
+
+The loop calls start_frame() at the top, lap(name) after each stage and
+end_frame() once the frame is on screen; each lap records the time since the
+previous one under that stage name. Samples go into fixed-size NumPy ring
+buffers, so recording allocates nothing, and the most recent frames can be
+summarized for the on-screen overlay or exported as CSV or a Chrome trace
+(chrome://tracing, Perfetto). While disabled every call returns after one
+flag check.
+"""
+import csv
+import json
+import time
+
+import numpy as np
+
+class FrameProfiler:
+    def __init__(self, max_frames=1800, max_events=32768):
+        self.enabled = False
+        self.stage_names = []
+        self.stage_ids = {}
+        # One row per stage sample
+        self.event_stage = np.zeros(max_events, dtype=np.int16)
+        self.event_frame = np.zeros(max_events, dtype=np.int64)
+        self.event_start = np.zeros(max_events)
+        self.event_duration = np.zeros(max_events)
+        self.events = 0  # Total recorded, the ring index is events % max_events
+        # One row per frame
+        self.frame_start = np.zeros(max_frames)
+        self.frame_duration = np.zeros(max_frames)
+        self.frames = 0
+        self.origin = time.perf_counter()
+        self.frame_begin = self.last = 0.0
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        # Nothing is recorded until the next start_frame()
+        self.frame_begin = self.last = 0.0
+
+    def stage_id(self, name):
+        if name not in self.stage_ids:
+            self.stage_ids[name] = len(self.stage_names)
+            self.stage_names.append(name)
+        return self.stage_ids[name]
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame_begin = self.last = time.perf_counter()
+
+    def lap(self, name):
+        """Record the time since the previous lap as stage name"""
+        if not self.enabled or not self.frame_begin:
+            return
+        now = time.perf_counter()
+        i = self.events % len(self.event_stage)
+        self.event_stage[i] = self.stage_id(name)
+        self.event_frame[i] = self.frames
+        self.event_start[i] = self.last - self.origin
+        self.event_duration[i] = now - self.last
+        self.events += 1
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_begin:
+            return
+        i = self.frames % len(self.frame_start)
+        self.frame_start[i] = self.frame_begin - self.origin
+        self.frame_duration[i] = time.perf_counter() - self.frame_begin
+        self.frames += 1
+
+    def recorded_events(self):
+        """Indices of the stored stage samples, oldest first"""
+        capacity = len(self.event_stage)
+        return (np.arange(max(0, self.events - capacity), self.events)) % capacity
+
+    def recorded_frames(self):
+        capacity = len(self.frame_start)
+        return (np.arange(max(0, self.frames - capacity), self.frames)) % capacity
+
+    def summary(self, window=60):
+        """Mean ms per stage and FPS over the last window frames.
+
+        Returns (fps, [(stage name, ms)]) in first-seen stage order, leaving
+        out stages that did not run in the window.
+        """
+        frames = min(window, self.frames, len(self.frame_start))
+        if not frames:
+            return 0.0, []
+        rows = self.recorded_events()
+        # Only completed frames, the current one is still being drawn
+        recent = self.event_frame[rows]
+        rows = rows[(recent >= self.frames - frames) & (recent < self.frames)]
+        stages = self.event_stage[rows]
+        totals = np.bincount(stages, weights=self.event_duration[rows], minlength=len(self.stage_names))
+        counts = np.bincount(stages, minlength=len(self.stage_names))
+        frame_rows = self.recorded_frames()[-frames:]
+        # Frame durations include the clock wait, so this is the real frame rate
+        fps = frames / self.frame_duration[frame_rows].sum()
+        stage_ms = 1000 * totals / frames
+        return fps, [(name, stage_ms[i]) for i, name in enumerate(self.stage_names) if counts[i]]
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "stage", "start_ms", "duration_ms"])
+            for i in self.recorded_events():
+                writer.writerow([int(self.event_frame[i]), self.stage_names[self.event_stage[i]],
+                                 f"{self.event_start[i] * 1000:.4f}", f"{self.event_duration[i] * 1000:.4f}"])
+
+    def export_chrome_trace(self, path):
+        """Write complete ("X") events, frames on one track and stages on another"""
+        events = []
+        for i in self.recorded_frames():
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": self.frame_start[i] * 1e6, "dur": self.frame_duration[i] * 1e6})
+        for i in self.recorded_events():
+            events.append({"name": self.stage_names[self.event_stage[i]], "ph": "X", "pid": 1, "tid": 2,
+                           "ts": self.event_start[i] * 1e6, "dur": self.event_duration[i] * 1e6,
+                           "args": {"frame": int(self.event_frame[i])}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, path):
+        """Export to CSV or, for any other extension, a Chrome trace JSON file"""
+        if path.lower().endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_chrome_trace(path)
+        print(f"Wrote {min(self.events, len(self.event_stage))} stage samples to {path}")
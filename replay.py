@@ -0,0 +1,119 @@
+"""Recording and replay of session input.
+
+The simulation only advances in fixed steps, so a session is reproduced
+exactly by its random seed, its starting mode and, for every rendered frame,
+the keys that were down and how many simulation steps the frame ran. The
+recorder stores those per-frame rows in a compressed .npz file together with
+a JSON header, plus any device sample streams added with record_samples().
+Replays feed the rows back in order, either paced by the recorded
+timestamps or as fast as possible.
+"""
+import json
+import time
+
+import numpy as np
+import pygame
+
+FORMAT_VERSION = 2  # 2: a held [B] is one blink, device blinks recorded
+# Keys the game reads, one bit each in the recorded key mask
+RECORDED_KEYS = [pygame.K_ESCAPE, pygame.K_r, pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_c, pygame.K_b]
+KEY_BITS = {key: 1 << bit for bit, key in enumerate(RECORDED_KEYS)}
+FRAME_DTYPE = np.dtype([("time", np.float64), ("steps", np.uint16), ("keys", np.uint16)])
+
+def key_mask(keys):
+    """Pack the recorded keys of a get_pressed() style lookup into a bit mask"""
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+class RecordedKeys:
+    """get_pressed() stand-in backed by a recorded key mask"""
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+class InputRecorder:
+    def __init__(self, path, header):
+        self.path = path
+        self.header = dict(header, version=FORMAT_VERSION, recorded_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+        self.frames = []
+        self.samples = {}
+        self.start = time.perf_counter()
+
+    def record_frame(self, steps, keys):
+        self.frames.append((time.perf_counter() - self.start, steps, key_mask(keys)))
+
+    def record_samples(self, name, values):
+        """Store a block of device samples (rows of channels) against the frame last passed to record_frame()"""
+        values = np.atleast_2d(np.asarray(values, dtype=np.float32))
+        self.samples.setdefault(name, []).append((len(self.frames) - 1, values))
+
+    def save(self, final_state=None):
+        """Write the recording; final_state lets replays check they ended up in the same place"""
+        header = dict(self.header, final_state=final_state)
+        arrays = {"frames": np.array(self.frames, dtype=FRAME_DTYPE)}
+        for name, blocks in self.samples.items():
+            arrays[f"samples_{name}"] = np.concatenate([values for _, values in blocks])
+            arrays[f"sample_frames_{name}"] = np.repeat([frame for frame, _ in blocks], [len(values) for _, values in blocks]).astype(np.int32)
+        with open(self.path, "wb") as f:
+            np.savez_compressed(f, header=np.array(json.dumps(header)), **arrays)
+        print(f"Recorded {len(self.frames)} frames to {self.path}")
+
+class InputReplay:
+    """Plays back a recording frame by frame.
+
+    speed scales the recorded pacing (1.0 is real time); 0 replays as fast
+    as possible.
+    """
+    def __init__(self, path, speed=1.0):
+        with np.load(path) as data:
+            self.header = json.loads(str(data["header"]))
+            if self.header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported recording version {self.header.get('version')}")
+            self.frames = data["frames"]
+            self.samples = {
+                name[len("samples_"):]: (data[name], data["sample_frames_" + name[len("samples_"):]])
+                for name in data.files if name.startswith("samples_")
+            }
+        self.speed = speed
+        self.index = 0
+        self.start = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def next_frame(self):
+        """Return (steps, keys) for the next frame, or None once the recording is over"""
+        if self.index >= len(self.frames):
+            return None
+        frame = self.frames[self.index]
+        if self.start is None:
+            self.start = time.perf_counter() - frame["time"] / self.speed if self.speed else 0
+        elif self.speed:
+            delay = self.start + frame["time"] / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.index += 1
+        return int(frame["steps"]), RecordedKeys(int(frame["keys"]))
+
+    def frame_samples(self, name):
+        """Samples of a stream recorded against the frame just returned by next_frame()"""
+        values, frames = self.samples[name]
+        # Rows are stored in frame order
+        start, end = np.searchsorted(frames, [self.index - 1, self.index])
+        return values[start:end]
+
+    def check(self, final_state):
+        """Compare the state the replay ended in with the recorded one"""
+        expected = self.header.get("final_state")
+        if expected is None:
+            return True
+        if expected != final_state:
+            print(f"Replay diverged: recorded final state {expected}, replay ended with {final_state}")
+            return False
+        print("Replay matched the recorded final state")
+        return True
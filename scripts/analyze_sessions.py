@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Relaxation progress across stored NeuroNest sessions.
+
+Scans a directory of session logs (data/sessions by default) on a pool of
+worker processes. Each worker maps one log and computes its metrics with
+whole-column NumPy operations: time to full growth, share of time calm,
+blinks and stress episodes, and the health trajectory. The metrics are then
+combined into a progress report per user, oldest session first.
+
+    python scripts/analyze_sessions.py
+    python scripts/analyze_sessions.py /mnt/clinic/sessions --workers 16 --json report.json --csv sessions.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from session_log import SessionLogReader
+
+# Match neuronest.py: the calm level shown as calm, and the blink rate counted as stress
+CALM_LEVEL = 0.5
+STRESS_SECONDS, STRESS_BLINKS = 3.0, 4
+SESSION_FIELDS = ["path", "user", "started", "mode", "minutes", "time_to_full_growth", "calm_ratio", "mean_calm",
+                  "blinks", "blinks_per_minute", "stressed_blinks", "stress_episodes", "health_start", "health_end",
+                  "health_min"]
+
+def stress(times):
+    """Which blinks at times make more than STRESS_BLINKS within STRESS_SECONDS,
+    and how many separate runs of such blinks there are"""
+    stressed = np.zeros(len(times), dtype=bool)
+    stressed[STRESS_BLINKS:] = times[STRESS_BLINKS:] - times[:-STRESS_BLINKS] < STRESS_SECONDS
+    # An episode ends once a blink is no longer stressed
+    episodes = int(np.count_nonzero(stressed[1:] & ~stressed[:-1]) + (len(stressed) > 0 and stressed[0]))
+    return stressed, episodes
+
+def analyze_session(path):
+    """Metrics of one session log, or {"path", "error"} if it cannot be read"""
+    try:
+        log = SessionLogReader(path)
+    except (OSError, ValueError, KeyError) as error:
+        return {"path": path, "error": str(error)}
+    if not len(log):
+        return {"path": path, "error": "no steps logged"}
+    header = log.header
+    sim_rate = header.get("sim_rate", 30)
+    t = log.column("time")
+    mode = log.column("mode")
+    modes = header.get("modes", ["static", "animated", "health"])
+    calm = log.column("calm")
+    health = log.column("health")
+
+    # The game records the limit each mode's growth is clamped to; older logs
+    # without them never count as fully grown
+    full = np.zeros(len(log), dtype=bool)
+    for index, name in enumerate(modes):
+        if name in header.get("full_growth", {}):
+            column, limit = header["full_growth"][name]
+            full |= (mode == index) & (log.column(column) >= limit)
+    first_full = int(np.argmax(full)) if full.any() else None
+
+    # A step can carry several blinks
+    blinks = log.column("blinks")
+    blink_times = np.repeat(t, blinks.astype(np.intp))
+    stressed, episodes = stress(blink_times)
+    minutes = len(log) / sim_rate / 60
+
+    return {
+        "path": path,
+        "user": header.get("user", "default"),
+        "started": header.get("started", ""),
+        "mode": header.get("mode", modes[int(mode[0])]),
+        "minutes": round(minutes, 2),
+        "time_to_full_growth": round(float(t[first_full]), 1) if first_full is not None else None,
+        "calm_ratio": round(float(np.count_nonzero(calm >= CALM_LEVEL) / len(log)), 4),
+        "mean_calm": round(float(calm.mean()), 4),
+        "blinks": len(blink_times),
+        "blinks_per_minute": round(len(blink_times) / minutes, 2),
+        "stressed_blinks": int(np.count_nonzero(stressed)),
+        "stress_episodes": episodes,
+        "health_start": float(health[0]),
+        "health_end": float(health[-1]),
+        "health_min": float(health.min()),
+        # Health at the end of every minute
+        "health_per_minute": health[sim_rate * 60 - 1::sim_rate * 60].tolist(),
+    }
+
+def trend(values):
+    """Change per session of a least-squares line through values, None for fewer than two"""
+    values = np.asarray([v for v in values if v is not None], dtype=float)
+    if len(values) < 2:
+        return None
+    return round(float(np.polyfit(np.arange(len(values)), values, 1)[0]), 4)
+
+def summarize_user(sessions):
+    """Progress of one user over their sessions, oldest first"""
+    sessions = sorted(sessions, key=lambda s: s["started"])
+    column = lambda name: np.array([s[name] for s in sessions], dtype=float)
+    minutes = column("minutes")
+    calm_ratio = column("calm_ratio")
+    full_times = [s["time_to_full_growth"] for s in sessions]
+    reached = [t for t in full_times if t is not None]
+    health_sessions = [s for s in sessions if s["mode"] == "health"]
+    return {
+        "sessions": len(sessions),
+        "first": sessions[0]["started"],
+        "last": sessions[-1]["started"],
+        "minutes": round(float(minutes.sum()), 1),
+        "calm_ratio": round(float(np.average(calm_ratio, weights=minutes)), 4),
+        "calm_ratio_first": sessions[0]["calm_ratio"],
+        "calm_ratio_last": sessions[-1]["calm_ratio"],
+        "calm_ratio_trend": trend(calm_ratio),
+        "full_growth_sessions": len(reached),
+        "median_time_to_full_growth": round(float(np.median(reached)), 1) if reached else None,
+        "time_to_full_growth_trend": trend(full_times),
+        "blinks_per_minute": round(float(column("blinks").sum() / minutes.sum()), 2),
+        "stress_episodes_per_hour": round(float(column("stress_episodes").sum() / minutes.sum() * 60), 2),
+        "health_gain": round(float(np.mean([s["health_end"] - s["health_start"] for s in health_sessions])), 1)
+                       if health_sessions else None,
+    }
+
+def find_logs(directory):
+    paths = []
+    for folder, _, names in os.walk(directory):
+        paths += [os.path.join(folder, name) for name in names if name.endswith(".nnsl")]
+    return sorted(paths)
+
+def print_report(users):
+    print(f"{'user':<16} {'sessions':>8} {'hours':>7} {'calm':>6} {'trend':>7} {'full at':>8} "
+          f"{'blinks/min':>10} {'stress/h':>8} {'health':>7}")
+    for user, summary in sorted(users.items()):
+        format_value = lambda value, spec: "-" if value is None else format(value, spec)
+        print(f"{user:<16} {summary['sessions']:>8} {summary['minutes'] / 60:>7.1f} {summary['calm_ratio']:>6.0%} "
+              f"{format_value(summary['calm_ratio_trend'], '+.3f'):>7} "
+              f"{format_value(summary['median_time_to_full_growth'], '.0f'):>7}s "
+              f"{summary['blinks_per_minute']:>10.1f} {summary['stress_episodes_per_hour']:>8.1f} "
+              f"{format_value(summary['health_gain'], '+.0f'):>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user relaxation progress from NeuroNest session logs")
+    parser.add_argument("directory", nargs="?", default=os.path.join(os.environ.get("NEURONEST_DATA_DIR", "data"),
+                                                                     "sessions"),
+                        help="directory searched for .nnsl session logs (default: data/sessions)")
+    parser.add_argument("--user", help="only this user's sessions")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all CPUs)")
+    parser.add_argument("--json", metavar="PATH", help="write the per-user report and every session's metrics as JSON")
+    parser.add_argument("--csv", metavar="PATH", help="write one row of metrics per session as CSV")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    paths = find_logs(args.directory)
+    if not paths:
+        sys.exit(f"No session logs in {args.directory}")
+    # Several logs per task keep the pool's overhead small next to the work
+    chunksize = max(1, len(paths) // (args.workers * 8))
+    with ProcessPoolExecutor(args.workers) as pool:
+        results = list(pool.map(analyze_session, paths, chunksize=chunksize))
+    sessions = [result for result in results if "error" not in result]
+    for result in results:
+        if "error" in result:
+            print(f"Skipped {result['path']}: {result['error']}", file=sys.stderr)
+    if args.user:
+        sessions = [session for session in sessions if session["user"] == args.user]
+
+    by_user = {}
+    for session in sessions:
+        by_user.setdefault(session["user"], []).append(session)
+    users = {user: summarize_user(user_sessions) for user, user_sessions in by_user.items()}
+    print_report(users)
+    print(f"Analyzed {len(sessions)} sessions of {len(users)} users in {time.perf_counter() - begin:.1f} s "
+          f"with {args.workers} workers", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": users, "sessions": sessions}, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, SESSION_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(sessions)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark for NeuroNest.
+
+Runs each mode under the SDL dummy video/audio drivers with scripted input,
+an uncapped frame rate and one simulation step per frame, then reports frame time percentiles, allocations
+per frame and peak RSS as JSON. Each mode runs in its own process so peak RSS
+is per mode.
+
+    python scripts/benchmark.py                    # print results
+    python scripts/benchmark.py --save-baseline    # store benchmarks/baseline.json
+    python scripts/benchmark.py --compare          # fail if slower than the baseline
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+MODES = ["static", "animated", "health"]
+
+# Run without a window or sound card
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+class ScriptedKeys:
+    """Stands in for pygame.key.get_pressed(): calm held two frames in three,
+    a blink every 7th frame, a stress burst of six blinks every 150 frames and a
+    reset every 450 frames so every growth stage keeps being exercised."""
+    def __init__(self, pygame):
+        self.pygame = pygame
+        self.frame = 0
+
+    def __call__(self):
+        self.frame += 1
+        return self
+
+    def __getitem__(self, key):
+        n = self.frame
+        if key == self.pygame.K_c:
+            return n % 3 != 0
+        if key == self.pygame.K_b:
+            return n % 7 == 0 or (n % 150 < 12 and n % 2 == 0)
+        if key == self.pygame.K_r:
+            return n % 450 == 0
+        return False
+
+def percentile_summary(samples):
+    import numpy as np
+    samples = np.asarray(samples)
+    return {
+        "mean": round(float(samples.mean()), 3),
+        "p50": round(float(np.percentile(samples, 50)), 3),
+        "p95": round(float(np.percentile(samples, 95)), 3),
+        "p99": round(float(np.percentile(samples, 99)), 3),
+        "max": round(float(samples.max()), 3),
+    }
+
+def run_mode(mode, frames, warmup, seed, dirty_rects, stages=False, replay_path=None):
+    """Benchmark one mode in this process and return its results.
+    With replay_path the recorded session's input, seed and mode are used instead."""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import pygame
+    import neuronest
+    from replay import InputReplay
+
+    if replay_path:
+        header = InputReplay(replay_path).header
+        mode, seed = header["mode"], header["seed"]
+    neuronest.init_display()
+    neuronest.load_sounds(play_music=False)
+    neuronest.init_resources()
+    neuronest.activate_mode(mode)
+
+    def start_pass():
+        """Reset the session, returning the input arguments for run_session"""
+        neuronest.seed_random(seed)
+        neuronest.activate_mode(mode)
+        neuronest.reset_game_state()
+        if replay_path:
+            return {"replay": InputReplay(replay_path, speed=0)}
+        return {"get_keys": ScriptedKeys(pygame), "lockstep": True}
+
+    # Timing pass: uncapped loop, one timestamp per presented frame
+    stamps = []
+    neuronest.profiler.enable(stages)
+    neuronest.run_session(mode, fps=0, max_frames=warmup + frames, dirty_rects=dirty_rects,
+                          on_frame=lambda n: stamps.append(time.perf_counter()), **start_pass())
+    frame_ms = [(b - a) * 1000 for a, b in zip(stamps[warmup:], stamps[warmup + 1:])]
+    stage_ms = {name: round(float(ms), 3) for name, ms in neuronest.profiler.summary(window=frames)[1]}
+    neuronest.profiler.enable(False)
+
+    # Allocation pass, kept separate so tracing does not skew the timings:
+    # Python heap growth within each frame and pygame.Surface constructions
+    surface_count = [0]
+    original_surface = pygame.Surface
+
+    class CountingSurface(original_surface):
+        def __init__(self, *args, **kwargs):
+            surface_count[0] += 1
+            super().__init__(*args, **kwargs)
+
+    alloc_kib = []
+    surfaces = []
+    frame_start = {}
+
+    def on_frame(n):
+        current, peak = tracemalloc.get_traced_memory()
+        if n > warmup:
+            alloc_kib.append((peak - frame_start["memory"]) / 1024)
+            surfaces.append(surface_count[0] - frame_start["surfaces"])
+        tracemalloc.reset_peak()
+        frame_start["memory"], frame_start["surfaces"] = current, surface_count[0]
+
+    pygame.Surface = CountingSurface
+    tracemalloc.start()
+    frame_start["memory"], frame_start["surfaces"] = tracemalloc.get_traced_memory()[0], 0
+    try:
+        neuronest.run_session(mode, fps=0, max_frames=warmup + min(frames, 300),
+                              dirty_rects=dirty_rects, on_frame=on_frame, **start_pass())
+    finally:
+        tracemalloc.stop()
+        pygame.Surface = original_surface
+
+    pygame.quit()
+    result = {
+        "frames": len(frame_ms),
+        "frame_ms": percentile_summary(frame_ms),
+        "fps": round(1000 / (sum(frame_ms) / len(frame_ms)), 1),
+        "surface_allocs_per_frame": round(sum(surfaces) / len(surfaces), 2),
+        "py_alloc_kib_per_frame": percentile_summary(alloc_kib),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if stages:
+        result["stage_ms"] = stage_ms
+    return result
+
+def run_all(args):
+    results = {}
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), "--child", mode,
+                   "--frames", str(args.frames), "--warmup", str(args.warmup), "--seed", str(args.seed)]
+        if args.dirty_rects:
+            command.append("--dirty-rects")
+        if args.stages:
+            command.append("--stages")
+        if args.replay:
+            command += ["--replay", os.path.abspath(args.replay)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        name = f"replay:{os.path.basename(args.replay)}" if args.replay else mode
+        results[name] = json.loads(output.strip().splitlines()[-1])
+        print(f"{name}: p50 {results[name]['frame_ms']['p50']} ms, p95 {results[name]['frame_ms']['p95']} ms, "
+              f"p99 {results[name]['frame_ms']['p99']} ms", file=sys.stderr)
+    return {
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "settings": {"frames": args.frames, "warmup": args.warmup, "seed": args.seed, "dirty_rects": args.dirty_rects,
+                     "replay": args.replay},
+        "modes": results,
+    }
+
+def compare(report, baseline, tolerance):
+    """Return a list of regressions against the baseline"""
+    regressions = []
+    for mode, result in report["modes"].items():
+        base = baseline["modes"].get(mode)
+        if base is None:
+            continue
+        checks = [
+            ("frame_ms.p95", result["frame_ms"]["p95"], base["frame_ms"]["p95"] * (1 + tolerance)),
+            ("frame_ms.p99", result["frame_ms"]["p99"], base["frame_ms"]["p99"] * (1 + tolerance)),
+            ("surface_allocs_per_frame", result["surface_allocs_per_frame"], base["surface_allocs_per_frame"] + 0.5),
+            ("peak_rss_mb", result["peak_rss_mb"], base["peak_rss_mb"] * (1 + tolerance)),
+        ]
+        for name, value, limit in checks:
+            if value > limit:
+                regressions.append(f"{mode} {name}: {value} > {limit:.2f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless NeuroNest benchmark")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--frames", type=int, default=600, help="measured frames per mode (default: 600)")
+    parser.add_argument("--warmup", type=int, default=30, help="frames run before measuring (default: 30)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--dirty-rects", action="store_true", help="benchmark the dirty-rectangle renderer")
+    parser.add_argument("--stages", action="store_true",
+                        help="also report mean ms per loop stage (timings then include the profiler's own cost)")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="drive the run with a session recorded with neuronest.py --record (its mode is used)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, metavar="PATH",
+                        help=f"baseline file for --save-baseline and --compare (default: {os.path.relpath(BASELINE_PATH, ROOT)})")
+    parser.add_argument("--save-baseline", action="store_true", help="store the report as the baseline")
+    parser.add_argument("--compare", action="store_true", help="exit with status 1 if any mode regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default: 0.25)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.replay and not args.child:
+        # One run, in the mode the session was recorded in
+        args.modes = [args.modes[0]]
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.frames, args.warmup, args.seed, args.dirty_rects, args.stages, args.replay)))
+        return 0
+
+    report = run_all(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["machine"] != report["machine"]:
+            print("Warning: baseline was recorded on a different machine", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
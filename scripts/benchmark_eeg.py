@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+EEG processing throughput for NeuroNest.
+
+Feeds two minutes of noise through the notch + bandpass filter
+alone and through the whole pipeline (filter, blink detection, band powers,
+calm score) in chunks of several sizes, and reports samples per second per
+channel and how many times faster than real time that is. The filter is
+also checked against a direct sample-by-sample implementation.
+
+    python scripts/benchmark_eeg.py
+    python scripts/benchmark_eeg.py --channels 8 32 --chunks 1 16 256 --output eeg.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eeg
+from eeg.filters import filter_reference
+
+def throughput(process, data, chunk):
+    """Samples per second per channel for process() fed data chunk samples at a time"""
+    begin = time.perf_counter()
+    for start in range(0, len(data), chunk):
+        process(data[start:start + chunk])
+    elapsed = time.perf_counter() - begin
+    return len(data) / elapsed
+
+def check_filter(rate, channels):
+    """Largest difference between the streaming filter and the direct recursion, relative to
+    the signal, and the direct recursion's samples per second per channel"""
+    rng = np.random.default_rng(0)
+    data = rng.normal(0, 10, (rate * 4, channels))
+    sos = eeg.design_eeg_filter(rate)
+    streaming = eeg.StreamingFilter(sos)
+    streaming.state = np.zeros((2 * len(sos), channels))  # Match the reference's zero initial state
+    chunks = np.split(data, np.sort(rng.integers(1, len(data), 20)))  # Uneven chunk sizes
+    filtered = np.concatenate([streaming.process(chunk) for chunk in chunks])
+    begin = time.perf_counter()
+    reference = filter_reference(sos, data)
+    reference_rate = len(data) / (time.perf_counter() - begin)
+    return float(np.abs(filtered - reference).max() / np.abs(reference).max()), reference_rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure EEG filter and pipeline throughput")
+    parser.add_argument("--rate", type=int, default=250, help="sample rate in Hz (default: 250)")
+    parser.add_argument("--channels", type=int, nargs="+", default=[8, 32], help="channel counts (default: 8 32)")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1, 16, 256, 4096],
+                        help="samples per call (default: 1 16 256 4096)")
+    parser.add_argument("--seconds", type=float, default=120, help="seconds of signal per run (default: 120)")
+    parser.add_argument("--output", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'channels':>8} {'chunk':>6} {'filter samples/s/ch':>20} {'pipeline samples/s/ch':>22} {'x real time':>12}")
+    for channels in args.channels:
+        data = np.random.default_rng(1).normal(0, 20, (int(args.rate * args.seconds), channels)).astype(np.float32)
+        source = eeg.SyntheticSource(args.rate, channels)  # Only supplies rate and channels
+        for chunk in args.chunks:
+            filter_rate = throughput(eeg.StreamingFilter(eeg.design_eeg_filter(args.rate)).process, data, chunk)
+            pipeline_rate = throughput(eeg.EEGPipeline(source).process, data, chunk)
+            rows.append({"channels": channels, "chunk": chunk, "filter_samples_per_s": round(filter_rate),
+                         "pipeline_samples_per_s": round(pipeline_rate),
+                         "realtime_factor": round(pipeline_rate / args.rate, 1)})
+            print(f"{channels:>8} {chunk:>6} {filter_rate:>20,.0f} {pipeline_rate:>22,.0f} "
+                  f"{pipeline_rate / args.rate:>12,.1f}")
+
+    error, reference_rate = check_filter(args.rate, args.channels[0])
+    print(f"Filter matches the direct recursion to {error:.1e} of full scale "
+          f"(which runs at {reference_rate:,.0f} samples/s/ch on {args.channels[0]} channels)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rate": args.rate, "filter_error": error, "reference_samples_per_s": round(reference_rate),
+                       "results": rows}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from PIL import Image
+import json
+import os
+import sys
+
+# Play order of the animation: frames 34-98 then 1-33 for looping
+DEFAULT_ORDER = list(range(34, 99)) + list(range(1, 34))
+MAX_ATLAS_WIDTH = 2048
+PADDING = 1  # Keeps smoothed edges of neighbouring frames apart
+
+def pack_shelves(sizes, max_width):
+    """Place rectangles on horizontal shelves, tallest first. Returns positions and atlas size."""
+    positions = {}
+    x = y = shelf_height = atlas_width = 0
+    for key, (width, height) in sorted(sizes.items(), key=lambda item: -item[1][1]):
+        if x + width > max_width:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        positions[key] = (x, y)
+        x += width + PADDING
+        shelf_height = max(shelf_height, height)
+        atlas_width = max(atlas_width, x - PADDING)
+    return positions, (atlas_width, y + shelf_height)
+
+def build_frame_atlas(frames_dir="assets/frames", output_path="assets/frames_atlas.png", order=DEFAULT_ORDER):
+    """Trim every frame to its visible pixels and pack them into one atlas image plus a JSON manifest."""
+    trimmed = {}
+    frame_size = None
+
+    for number in order:
+        frame_path = os.path.join(frames_dir, f"frame_{number:03}.png")
+        if not os.path.exists(frame_path):
+            print(f"Error: frame '{frame_path}' not found!")
+            return False
+        with Image.open(frame_path) as img:
+            img = img.convert("RGBA")
+            frame_size = frame_size or img.size
+            if img.size != frame_size:
+                print(f"Error: {frame_path} is {img.size}, expected {frame_size}")
+                return False
+            # Fully transparent frames keep a 1x1 placeholder
+            bbox = img.getchannel("A").getbbox() or (0, 0, 1, 1)
+            trimmed[number] = (bbox, img.crop(bbox))
+
+    positions, atlas_size = pack_shelves({number: crop.size for number, (_, crop) in trimmed.items()}, MAX_ATLAS_WIDTH)
+    atlas = Image.new("RGBA", atlas_size, (0, 0, 0, 0))
+    frames = {}
+    for number, (bbox, crop) in trimmed.items():
+        x, y = positions[number]
+        atlas.paste(crop, (x, y))
+        frames[str(number)] = {"rect": [x, y, crop.width, crop.height], "offset": [bbox[0], bbox[1]]}
+
+    atlas.save(output_path, format="PNG", optimize=True)
+    manifest = {
+        "image": os.path.basename(output_path),
+        "frame_size": list(frame_size),
+        "order": list(order),
+        "frames": frames,
+    }
+    manifest_path = os.path.splitext(output_path)[0] + ".json"
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    original_pixels = frame_size[0] * frame_size[1] * len(order)
+    print(f"Packed {len(order)} frames into {output_path} ({atlas_size[0]}x{atlas_size[1]}, "
+          f"{100 * atlas_size[0] * atlas_size[1] / original_pixels:.0f}% of the original pixels)")
+    print(f"Wrote manifest to {manifest_path}")
+    return True
+
+if __name__ == "__main__":
+    # Optional: frames directory and atlas output path as arguments
+    frames_dir = sys.argv[1] if len(sys.argv) > 1 else "assets/frames"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "assets/frames_atlas.png"
+
+    if not build_frame_atlas(frames_dir, output_path):
+        sys.exit(1)
@@ -0,0 +1,61 @@
+from PIL import Image
+import json
+import os
+import sys
+
+TREE_NAMES = ["tree_small", "tree_medium", "tree_large"]
+MIN_LEVEL_WIDTH = 128   # Smaller levels are never drawn
+MAX_LEVEL_WIDTH = 1100  # Nothing wider than the window is ever drawn
+
+def build_mip_chain(source_path, output_dir):
+    """Write power-of-two resized copies of a tree image, returning their manifest entries."""
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    levels = []
+
+    with Image.open(source_path) as img:
+        img = img.convert("RGBA")
+        width, height = img.size
+
+        # One enlarged level for the trees the game draws above their native size,
+        # then halve down to the smallest useful width. The source itself is level 1.0.
+        factor = 2.0
+        while width * factor >= MIN_LEVEL_WIDTH:
+            level_width = int(width * factor)
+            level_height = int(height * factor)
+            if factor != 1.0 and level_width <= MAX_LEVEL_WIDTH:
+                level_name = f"{name}_{level_width}.png"
+                resized = img.resize((level_width, level_height), Image.LANCZOS)
+                resized.save(os.path.join(output_dir, level_name), format="PNG", optimize=True)
+                levels.append({"file": level_name, "size": [level_width, level_height]})
+                print(f"  {level_name}: {level_width}x{level_height}")
+            factor /= 2
+
+    return {"size": [width, height], "levels": levels}
+
+def build_tree_mips(assets_dir="assets", output_dir=None):
+    """Build the mip chain for every tree stage and write manifest.json next to it."""
+    output_dir = output_dir or os.path.join(assets_dir, "trees")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {}
+    for name in TREE_NAMES:
+        source_path = os.path.join(assets_dir, f"{name}.png")
+        if not os.path.exists(source_path):
+            print(f"Error: tree image '{source_path}' not found!")
+            return False
+        print(f"Building levels for {source_path}")
+        manifest[name] = build_mip_chain(source_path, output_dir)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Wrote tree mip levels and manifest to {output_dir}")
+    return True
+
+if __name__ == "__main__":
+    # Optional: assets directory and output directory as arguments
+    assets_dir = sys.argv[1] if len(sys.argv) > 1 else "assets"
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if not build_tree_mips(assets_dir, output_dir):
+        sys.exit(1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Write EEG recordings that NeuroNest can play back with --eeg-source.
+
+Takes the raw samples of a session recorded with --record while a device
+was connected, or generates a synthetic signal, and writes them as NEEG
+(.neeg) or CSV (.csv), chosen by the output's extension.
+
+    python scripts/export_eeg.py session.npz session.neeg
+    python scripts/export_eeg.py --synthetic 60 --channels 8 hour.neeg
+    python neuronest.py --eeg-source hour.neeg --eeg-speed 20 --mode health --no-render
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eeg
+
+def main():
+    parser = argparse.ArgumentParser(description="Write EEG for playback as NEEG or CSV")
+    parser.add_argument("input", nargs="?", help="session recorded with --record while a device was connected")
+    parser.add_argument("output", help="file to write, .neeg or .csv")
+    parser.add_argument("--synthetic", type=float, metavar="MINUTES", help="generate this much synthetic EEG instead")
+    parser.add_argument("--rate", type=int, default=250,
+                        help="sample rate of generated EEG, or of a session that does not store it (default: 250)")
+    parser.add_argument("--channels", type=int, default=8, help="channels of generated EEG (default: 8)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated EEG (default: 0)")
+    args = parser.parse_args()
+    if (args.input is None) == (args.synthetic is None):
+        parser.error("give either a session recording or --synthetic MINUTES")
+    if not eeg.is_recording(args.output):
+        parser.error("output must end in .neeg or .csv")
+
+    if args.synthetic is not None:
+        source = eeg.SyntheticSource(args.rate, args.channels, seed=args.seed)
+        samples, rate = source.generate(int(args.synthetic * 60 * args.rate)), args.rate
+    else:
+        from replay import InputReplay
+        session = InputReplay(args.input)
+        if "eeg" not in session.samples:
+            sys.exit(f"{args.input} holds no EEG samples; record with a device connected")
+        samples, rate = session.samples["eeg"][0], session.header.get("eeg_rate", args.rate)
+
+    if args.output.lower().endswith(".csv"):
+        labels = ",".join(f"ch{i + 1}" for i in range(samples.shape[1]))
+        np.savetxt(args.output, samples, fmt="%.3f", delimiter=",", header=labels, comments="")
+    else:
+        eeg.write_neeg(args.output, samples, rate)
+    print(f"Wrote {len(samples) / rate:.0f} s of {rate} Hz x {samples.shape[1]} ch EEG to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Append-only log of every simulation tick of a session.
+
+A log is a JSON header followed by blocks of BLOCK_TICKS ticks. Each block
+holds one fixed-width array per column, so the file is a sequence of
+identical fixed-size records whose columns are contiguous within them. The
+game only fills preallocated arrays; a background thread writes each block
+once it is full, so the frame loop never waits on the disk. Reading maps
+the blocks into memory as one structured NumPy array without loading them.
+
+The file starts with MAGIC, a little-endian uint32 header length and the
+header, padded with spaces so the blocks start 8-byte aligned. The last
+block is padded with rows whose tick is -1.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"NNSL"
+FORMAT_VERSION = 1
+BLOCK_TICKS = 256  # About 8.5 s of a 30 steps/s session per write
+
+def block_dtype(columns, block_ticks=BLOCK_TICKS):
+    """One block: block_ticks values of every (name, dtype) column, column after column"""
+    return np.dtype([(name, dtype, (block_ticks,)) for name, dtype in [("tick", "<i4")] + columns])
+
+class SessionLog:
+    """Writes the ticks of one session to path.
+
+    columns lists (name, dtype) pairs; append() takes one value per column
+    in that order.
+    """
+    def __init__(self, path, columns, header):
+        self.path = path
+        self.columns = [name for name, _ in columns]
+        self.dtype = block_dtype(columns)
+        self.ticks = 0
+        self.block = self.new_block()
+        self.blocks = queue.Queue()
+        header = dict(header, version=FORMAT_VERSION, block_ticks=BLOCK_TICKS, columns=columns,
+                      started=time.strftime("%Y-%m-%d %H:%M:%S"))
+        header_bytes = json.dumps(header).encode()
+        header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % 8)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        self.writer = threading.Thread(target=self.write_blocks, name="session-log", daemon=True)
+        self.writer.start()
+
+    def new_block(self):
+        block = np.zeros((), dtype=self.dtype)
+        block["tick"] = -1
+        return block
+
+    def append(self, values):
+        row = self.ticks % BLOCK_TICKS
+        self.block["tick"][row] = self.ticks
+        for name, value in zip(self.columns, values):
+            self.block[name][row] = value
+        self.ticks += 1
+        if row == BLOCK_TICKS - 1:
+            self.blocks.put(self.block)
+            self.block = self.new_block()
+
+    def write_blocks(self):
+        while True:
+            block = self.blocks.get()
+            if block is None:
+                break
+            self.file.write(block.tobytes())
+            self.file.flush()
+
+    def close(self):
+        """Write the partly filled last block and wait for everything to reach the file"""
+        if self.ticks % BLOCK_TICKS:
+            self.blocks.put(self.block)
+        self.blocks.put(None)
+        self.writer.join()
+        self.file.close()
+        print(f"Logged {self.ticks} ticks to {self.path} ({os.path.getsize(self.path) // 1024} KB)")
+
+class SessionLogReader:
+    """A session log mapped into memory.
+
+    blocks is the structured (blocks,) array of the file; column(name)
+    gives one column's ticks as a flat array.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            start = f.read(len(MAGIC) + 4)
+            if start[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a session log")
+            header_length, = struct.unpack("<I", start[len(MAGIC):])
+            self.header = json.loads(f.read(header_length))
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported session log version {self.header.get('version')}")
+        offset = len(MAGIC) + 4 + header_length
+        block_ticks = self.header["block_ticks"]
+        dtype = block_dtype([tuple(column) for column in self.header["columns"]], block_ticks)
+        count = (os.path.getsize(path) - offset) // dtype.itemsize
+        self.blocks = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)) if count else \
+            np.zeros(0, dtype=dtype)
+        # Only the last block can be partly filled
+        self.ticks = (count - 1) * block_ticks + int((self.blocks[-1]["tick"] >= 0).sum()) if count else 0
+
+    def __len__(self):
+        return self.ticks
+
+    @property
+    def columns(self):
+        return [name for name, _ in self.header["columns"]]
+
+    def column(self, name):
+        """Every tick of one column, a view when the log is a single block"""
+        return self.blocks[name].reshape(-1)[:self.ticks]
@@ -0,0 +1,102 @@
+"""Running wellness statistics of a session, updated once per simulation step.
+
+Every statistic is kept by a streaming accumulator so a step costs the same
+however long the session runs: windowed sums over fixed rings of the last
+window_seconds of steps, a current and longest calm streak, and a fast and a
+slow exponentially weighted average of calm whose difference is the trend.
+Totals over the whole session are kept alongside for its summary.
+"""
+import math
+
+import numpy as np
+
+class WindowedSum:
+    """Sum of the last length values added, kept by subtracting whatever drops out of a ring"""
+    def __init__(self, length):
+        self.values = np.zeros(length, dtype=np.int32)
+        self.total = 0
+        self.count = 0  # Values added, the ring index is count % length
+
+    def add(self, value):
+        index = self.count % len(self.values)
+        self.total += value - int(self.values[index])
+        self.values[index] = value
+        self.count += 1
+
+    @property
+    def filled(self):
+        return min(self.count, len(self.values))
+
+    def clear(self):
+        self.values.fill(0)
+        self.total = self.count = 0
+
+class WellnessStats:
+    """Calm share and blink rate over the last window_seconds, the longest calm
+    streak and whether calm is rising, for steps step_seconds long.
+
+    A step counts as calm when its calm drive is at least calm_threshold.
+    """
+    MIN_RATE_SECONDS = 10.0  # Blink rates over less time than this swing too much to show
+    TREND_THRESHOLD = 0.05  # Calm difference between the fast and slow averages that counts as a trend
+
+    def __init__(self, step_seconds, window_seconds=60.0, calm_threshold=0.5, fast_seconds=10.0, slow_seconds=120.0):
+        self.step_seconds = step_seconds
+        self.calm_threshold = calm_threshold
+        window = int(round(window_seconds / step_seconds))
+        self.calm_steps = WindowedSum(window)
+        self.blinks = WindowedSum(window)
+        self.fast_weight = 1 - math.exp(-step_seconds / fast_seconds)
+        self.slow_weight = 1 - math.exp(-step_seconds / slow_seconds)
+        # Whole-session totals, which reset() leaves alone
+        self.session_steps = self.session_calm_steps = self.session_blinks = self.session_longest_streak = 0
+        self.reset()
+
+    def reset(self):
+        self.calm_steps.clear()
+        self.blinks.clear()
+        self.streak = self.longest_streak = 0  # In steps
+        self.fast_calm = self.slow_calm = None
+
+    def update(self, calm, blinks=0):
+        """Account for one step with calm drive calm (0-1) and blinks new blinks"""
+        is_calm = calm >= self.calm_threshold
+        self.calm_steps.add(is_calm)
+        self.blinks.add(blinks)
+        self.streak = self.streak + 1 if is_calm else 0
+        self.longest_streak = max(self.longest_streak, self.streak)
+        self.session_steps += 1
+        self.session_calm_steps += is_calm
+        self.session_blinks += blinks
+        self.session_longest_streak = max(self.session_longest_streak, self.streak)
+        if self.fast_calm is None:
+            self.fast_calm = self.slow_calm = calm
+        else:
+            self.fast_calm += (calm - self.fast_calm) * self.fast_weight
+            self.slow_calm += (calm - self.slow_calm) * self.slow_weight
+
+    @property
+    def calm_percent(self):
+        filled = self.calm_steps.filled
+        return 100 * self.calm_steps.total / filled if filled else 0.0
+
+    @property
+    def blinks_per_minute(self):
+        seconds = max(self.blinks.filled * self.step_seconds, self.MIN_RATE_SECONDS)
+        return 60 * self.blinks.total / seconds
+
+    @property
+    def longest_calm_seconds(self):
+        return self.longest_streak * self.step_seconds
+
+    @property
+    def trend(self):
+        """rising, falling or steady: the fast calm average against the slow one"""
+        if self.fast_calm is None:
+            return "steady"
+        difference = self.fast_calm - self.slow_calm
+        if difference > self.TREND_THRESHOLD:
+            return "rising"
+        if difference < -self.TREND_THRESHOLD:
+            return "falling"
+        return "steady"